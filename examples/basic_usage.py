@@ -8,6 +8,11 @@ from dotenv import load_dotenv
 
 from llm_factory import LLMFactory, ModelConfig, ProviderType, ChatMessage
 
+try:
+    from uvloop import run
+except ImportError:
+    from asyncio import run
+
 load_dotenv()
 
 
@@ -35,8 +40,11 @@ async def basic_example():
     print("Response:", response.choices[0]["message"]["content"])
 
 
-async def load_balancing_example():
+async def load_balancing_example(max_concurrency: int = 5):
     """Load balancing example with multiple providers."""
+    # Raise the connection pool limits (httpx default: 100 connections) when
+    # running large batches of concurrent requests.
+    http_limits = {"max_connections": 2000, "max_keepalive_connections": 1500}
     configs = [
         ModelConfig(
             provider=ProviderType.OPENAI,
@@ -44,19 +52,32 @@ async def load_balancing_example():
             api_key=os.getenv("OPENAI_API_KEY"),
             api_base=os.getenv("OPENAI_API_BASE"),
             api_version=os.getenv("OPENAI_API_VERSION"),
+            http_limits=http_limits,
         ),
         ModelConfig(
             provider=ProviderType.DEEPSEEK,
             model_name="deepseek-chat",
             api_key=os.getenv("DEEPSEEK_API_KEY"),
+            http_limits=http_limits,
         ),
     ]
     
     factory = LLMFactory(configs)
     
-    for i in range(5):
-        response = await factory.chat_async(f"Request {i}: Tell me a joke")
-        print(f"Response {i}:", response.choices[0]["message"]["content"][:100])
+    # Fan the requests out concurrently; the semaphore keeps larger batches
+    # within provider rate limits.
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def ask(i: int):
+        async with semaphore:
+            return await factory.chat_async(f"Request {i}: Tell me a joke")
+    
+    responses = await asyncio.gather(*(ask(i) for i in range(5)), return_exceptions=True)
+    for i, response in enumerate(responses):
+        if isinstance(response, Exception):
+            print(f"Response {i} failed:", response)
+        else:
+            print(f"Response {i}:", response.choices[0]["message"]["content"][:100])
 
 
 async def streaming_example():
@@ -99,13 +120,13 @@ def synchronous_example():
 
 if __name__ == "__main__":
     print("=== Basic Example ===")
-    asyncio.run(basic_example())
+    run(basic_example())
     
     print("\n=== Load Balancing Example ===")
-    asyncio.run(load_balancing_example())
+    run(load_balancing_example())
     
     print("\n=== Streaming Example ===")
-    asyncio.run(streaming_example())
+    run(streaming_example())
     
     print("\n=== Synchronous Example ===")
     synchronous_example()
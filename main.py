@@ -2,15 +2,42 @@
 Main entry point for the LLM Factory API server.
 """
 
+import os
+
 import uvicorn
-from src.llm_factory.api.app import create_app
+
+from src.llm_factory.api.app import setup_logging
+
+try:
+    import uvloop  # noqa: F401
+    LOOP = "uvloop"
+except ImportError:  # uvloop is not available on Windows
+    LOOP = "asyncio"
+
+try:
+    import httptools  # noqa: F401
+    HTTP = "httptools"
+except ImportError:
+    HTTP = "h11"
+
+# Runs at import time so spawned worker processes, which re-import this
+# module, get the same logging setup as the parent.
+setup_logging()
 
 if __name__ == "__main__":
-    app = create_app()
+    # Each worker builds its own factory and connection pools at startup and
+    # closes them on shutdown, so no sticky sessions are needed in front of
+    # the workers.
     uvicorn.run(
-        app,
+        "src.llm_factory.api.app:create_app",
+        factory=True,
         host="0.0.0.0",
         port=8000,
-        log_level="info",
-        access_log=True,
+        workers=int(os.getenv("WORKERS", (os.cpu_count() or 1) * 2 + 1)),
+        loop=LOOP,
+        http=HTTP,
+        # Leave uvicorn's loggers unconfigured so they propagate to loguru
+        log_config=None,
+        log_level=os.getenv("LOG_LEVEL", "warning").lower(),
+        access_log=os.getenv("LOG_ACCESS") == "1",
     )
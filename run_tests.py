@@ -11,7 +11,12 @@ from typing import List, Optional
 from termcolor import colored
 
 
-def run_tests(test_paths: Optional[List[str]] = None, verbose: bool = False, coverage: bool = True) -> bool:
+def run_tests(
+    test_paths: Optional[List[str]] = None,
+    verbose: bool = False,
+    coverage: bool = False,
+    parallel: bool = False
+) -> bool:
     """
     Run pytest with specified test paths.
     
@@ -19,11 +24,13 @@ def run_tests(test_paths: Optional[List[str]] = None, verbose: bool = False, cov
         test_paths: List of test paths to run, or None to run all tests
         verbose: Whether to show verbose output
         coverage: Whether to generate coverage reports
+        parallel: Whether to spread test files across CPU cores with pytest-xdist
     
     Returns:
         bool: True if all tests passed
     """
-    pytest_args = []
+    # Plugin autoloading is disabled in main(), so load the ones we rely on explicitly
+    pytest_args = ["-p", "pytest_asyncio.plugin"]
     
     # Add verbosity flag
     if verbose:
@@ -40,6 +47,7 @@ def run_tests(test_paths: Optional[List[str]] = None, verbose: bool = False, cov
         try:
             import pytest_cov
             pytest_args.extend([
+                "-p", "pytest_cov",
                 "--cov=src",
                 "--cov-report=term-missing",
                 "--cov-report=html:coverage_report"
@@ -47,6 +55,14 @@ def run_tests(test_paths: Optional[List[str]] = None, verbose: bool = False, cov
         except ImportError:
             print(colored("Warning: pytest-cov not installed. Coverage report will be skipped.", "yellow"))
     
+    # Distribute whole test files across workers so module fixtures are built once per file
+    if parallel:
+        try:
+            import xdist
+            pytest_args.extend(["-p", "xdist.plugin", "-n", "auto", "--dist=loadfile"])
+        except ImportError:
+            print(colored("Warning: pytest-xdist not installed. Tests will run serially.", "yellow"))
+    
     try:
         return pytest.main(pytest_args) == 0
     except Exception as e:
@@ -66,7 +82,17 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="Run LLM Factory tests")
     parser.add_argument("--verbose", "-v", action="store_true", help="Show verbose output")
     parser.add_argument("--test", "-t", nargs="+", help="Specific test files or directories to run")
-    parser.add_argument("--no-coverage", action="store_true", help="Disable coverage reporting")
+    parser.add_argument(
+        "--coverage",
+        action="store_true",
+        default=bool(os.getenv("CI")),
+        help="Enable coverage reporting (default: on when CI is set)",
+    )
+    parser.add_argument(
+        "--parallel", "-n",
+        action="store_true",
+        help="Run test files in parallel across CPU cores (requires pytest-xdist)",
+    )
     args = parser.parse_args()
     
     print_header("LLM Factory Test Suite")
@@ -78,11 +104,16 @@ def main() -> None:
     # Add project root to Python path
     sys.path.insert(0, project_root)
     
+    # Skip bytecode writes and entry-point plugin discovery for faster startup
+    sys.dont_write_bytecode = True
+    os.environ.setdefault("PYTEST_DISABLE_PLUGIN_AUTOLOAD", "1")
+    
     # Run tests
     success = run_tests(
         test_paths=args.test,
         verbose=args.verbose,
-        coverage=not args.no_coverage
+        coverage=args.coverage,
+        parallel=args.parallel
     )
     
     if success:
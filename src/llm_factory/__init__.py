@@ -2,9 +2,36 @@
 LLM Factory - A unified interface for multiple AI model providers.
 """
 
-from .models import ChatMessage, ChatResponse, ModelConfig
-from .providers import ProviderType
-from .factory import LLMFactory
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .factory import LLMFactory
+    from .models import ChatMessage, ChatResponse, ModelConfig
+    from .providers import ProviderType
 
 __version__ = "0.1.0"
 __all__ = ["LLMFactory", "ChatMessage", "ChatResponse", "ModelConfig", "ProviderType"]
+
+# Public names are resolved on first access so that importing the package does
+# not pull in every provider SDK up front.
+_LAZY_ATTRS = {
+    "LLMFactory": ".factory",
+    "ChatMessage": ".models",
+    "ChatResponse": ".models",
+    "ModelConfig": ".models",
+    "ProviderType": ".providers",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
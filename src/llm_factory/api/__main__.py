@@ -2,15 +2,39 @@
 Entry point for running the API server.
 """
 
+import os
+
 import uvicorn
-from .app import create_app
+
+from .app import setup_logging
+
+try:
+    import uvloop  # noqa: F401
+    LOOP = "uvloop"
+except ImportError:  # uvloop is not available on Windows
+    LOOP = "asyncio"
+
+try:
+    import httptools  # noqa: F401
+    HTTP = "httptools"
+except ImportError:
+    HTTP = "h11"
+
+# Runs at import time so spawned worker processes, which re-import this
+# module, get the same logging setup as the parent.
+setup_logging()
 
 if __name__ == "__main__":
-    app = create_app()
     uvicorn.run(
-        app,
+        f"{__package__}.app:create_app",
+        factory=True,
         host="0.0.0.0",
         port=8000,
-        log_level="info",
-        access_log=True,
+        workers=int(os.getenv("WORKERS", (os.cpu_count() or 1) * 2 + 1)),
+        loop=LOOP,
+        http=HTTP,
+        # Leave uvicorn's loggers unconfigured so they propagate to loguru
+        log_config=None,
+        log_level=os.getenv("LOG_LEVEL", "warning").lower(),
+        access_log=os.getenv("LOG_ACCESS") == "1",
     )
@@ -2,11 +2,72 @@
 FastAPI application factory.
 """
 
+import inspect
+import logging
+import os
+import sys
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import orjson
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from loguru import logger
 
-from .routes import router
+from .routes import close_factory, get_factory, router
+
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "llm-factory"})
+
+
+class InterceptHandler(logging.Handler):
+    """Forward standard logging records (e.g. uvicorn's) to loguru."""
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        
+        # Skip logging's own frames so loguru reports the original caller
+        frame, depth = inspect.currentframe(), 0
+        while frame is not None and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+        
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+
+def setup_logging(level: Optional[str] = None) -> None:
+    """
+    Route all logging through a single queued loguru sink.
+    
+    The sink writes from a background thread so log calls made while serving
+    requests never block the event loop on stderr.
+    """
+    level = (level or os.getenv("LOG_LEVEL", "WARNING")).upper()
+    logger.remove()
+    logger.add(sys.stderr, level=level, enqueue=True)
+    # Filter at the stdlib root too, so records below LOG_LEVEL are dropped
+    # before a LogRecord is built and forwarded; loguru's level numbers match
+    # the stdlib ones
+    logging.basicConfig(handlers=[InterceptHandler()], level=logger.level(level).no, force=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Build the shared factory on startup and close it on shutdown."""
+    logger.info("LLM Factory API starting up...")
+    try:
+        await get_factory()
+    except Exception as e:
+        # The factory can still be set up later through /factory/configure
+        logger.warning(f"Factory not initialized at startup: {e}")
+    
+    yield
+    
+    logger.info("LLM Factory API shutting down...")
+    await close_factory()
 
 
 def create_app() -> FastAPI:
@@ -17,31 +78,26 @@ def create_app() -> FastAPI:
         version="0.1.0",
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
     
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
-    )
+    # CORS is only needed for browser clients; skip the middleware entirely for
+    # server-to-server deployments that do not configure any origins.
+    cors_origins = [o for o in map(str.strip, os.getenv("CORS_ORIGINS", "").split(",")) if o]
+    if cors_origins:
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=cors_origins,
+            allow_credentials=True,
+            allow_methods=["GET", "POST"],
+            allow_headers=["authorization", "content-type"],
+        )
     
     app.include_router(router, prefix="/api/v1")
     
     @app.get("/health")
     async def health_check():
         """Health check endpoint."""
-        return {"status": "healthy", "service": "llm-factory"}
-    
-    @app.on_event("startup")
-    async def startup_event():
-        """Application startup event."""
-        logger.info("LLM Factory API starting up...")
-    
-    @app.on_event("shutdown")
-    async def shutdown_event():
-        """Application shutdown event."""
-        logger.info("LLM Factory API shutting down...")
+        return Response(content=_HEALTH_BODY, media_type="application/json")
     
     return app
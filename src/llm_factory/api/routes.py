@@ -2,41 +2,81 @@
 API routes for the LLM Factory.
 """
 
+import asyncio
 import os
-from typing import Any, Dict, List, Optional, Union
+from typing import List, Optional, Union
 
+import orjson
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from loguru import logger
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from ..factory import LLMFactory
 from ..models import ChatCompletionRequest, ChatMessage, ModelConfig
 from ..providers import ProviderType
 
-from dotenv import load_dotenv
-load_dotenv()
-
 router = APIRouter()
 
 _factory: Optional[LLMFactory] = None
+# Created on first use: before Python 3.10 a Lock binds to the event loop
+# current at construction, which at import time is not the server's loop
+_factory_lock: Optional[asyncio.Lock] = None
+
+# Pre-serialized bodies for endpoints that only change when the factory does
+_models_cache: Optional[bytes] = None
+_status_cache: Optional[bytes] = None
+
+# Fixed "created" timestamp reported for every model in /models
+_MODEL_CREATED = 1677610602
 
 
 class FactoryConfig(BaseModel):
     """Configuration for initializing the factory."""
-    providers: List[Dict[str, Any]]
+    providers: List[ModelConfig] = Field(..., min_length=1)
 
 
-def get_factory() -> LLMFactory:
+async def get_factory() -> LLMFactory:
     """Get or create the global factory instance."""
     global _factory
     
-    if _factory is None:
-        _factory = LLMFactory.create()
+    if _factory is not None:
+        return _factory
+    
+    async with _get_factory_lock():
+        if _factory is None:
+            _factory = LLMFactory.create()
+            _invalidate_caches()
     
     return _factory
 
 
+async def close_factory() -> None:
+    """Close and drop the global factory instance, if any."""
+    global _factory
+    
+    async with _get_factory_lock():
+        factory, _factory = _factory, None
+        _invalidate_caches()
+    if factory is not None:
+        await factory.aclose()
+
+
+def _get_factory_lock() -> asyncio.Lock:
+    """The lock guarding _factory, created inside the running event loop."""
+    global _factory_lock
+    if _factory_lock is None:
+        _factory_lock = asyncio.Lock()
+    return _factory_lock
+
+
+def _invalidate_caches() -> None:
+    """Drop the pre-serialized responses derived from the factory."""
+    global _models_cache, _status_cache
+    _models_cache = None
+    _status_cache = None
+
+
 @router.post("/chat/completions")
 async def chat_completions(request: ChatCompletionRequest):
     """
@@ -45,22 +85,28 @@ async def chat_completions(request: ChatCompletionRequest):
     Compatible with OpenAI API format.
     """
     try:
-        factory = get_factory()
+        factory = await get_factory()
+        
+        # Only forward fields the client actually sent so unset ones fall back
+        # to the provider defaults; "model" is kept for model-based routing.
+        params = request.model_dump(exclude={"messages"}, exclude_unset=True)
+        params["stream"] = bool(request.stream)
         
         if request.stream:
             async def generate():
-                async for chunk in factory.stream_async(request.messages, **request.model_dump(exclude={"messages"})):
-                    yield f"data: {chunk.json()}\n\n"
-                yield "data: [DONE]\n\n"
+                dumps = orjson.dumps
+                async for chunk in factory.stream_async(request.messages, **params):
+                    yield b"data: " + dumps(chunk.model_dump()) + b"\n\n"
+                yield b"data: [DONE]\n\n"
             
             return StreamingResponse(
                 generate(),
-                media_type="text/plain",
+                media_type="text/event-stream",
                 headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
             )
         else:
-            response = await factory.chat_async(request.messages, **request.model_dump(exclude={"messages"}))
-            return response
+            response = await factory.chat_async(request.messages, **params)
+            return Response(content=orjson.dumps(response.model_dump()), media_type="application/json")
             
     except Exception as e:
         logger.error(f"Chat completion error: {e}")
@@ -70,21 +116,27 @@ async def chat_completions(request: ChatCompletionRequest):
 @router.get("/models")
 async def list_models():
     """List available models."""
+    global _models_cache
+    
     try:
-        factory = get_factory()
-        status = factory.get_provider_status()
-        
-        models = []
-        for provider in status["providers"]:
-            models.append({
-                "id": provider["model"],
-                "object": "model",
-                "created": 1677610602,
-                "owned_by": provider["provider"],
-                "provider_type": provider["type"],
+        if _models_cache is None:
+            factory = await get_factory()
+            status = factory.get_provider_status()
+            _models_cache = orjson.dumps({
+                "object": "list",
+                "data": [
+                    {
+                        "id": provider["model"],
+                        "object": "model",
+                        "created": _MODEL_CREATED,
+                        "owned_by": provider["provider"],
+                        "provider_type": provider["type"],
+                    }
+                    for provider in status["providers"]
+                ],
             })
         
-        return {"object": "list", "data": models}
+        return Response(content=_models_cache, media_type="application/json")
         
     except Exception as e:
         logger.error(f"List models error: {e}")
@@ -94,9 +146,14 @@ async def list_models():
 @router.get("/providers/status")
 async def provider_status():
     """Get status of all providers."""
+    global _status_cache
+    
     try:
-        factory = get_factory()
-        return factory.get_provider_status()
+        if _status_cache is None:
+            factory = await get_factory()
+            _status_cache = orjson.dumps(factory.get_provider_status())
+        
+        return Response(content=_status_cache, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Provider status error: {e}")
@@ -112,15 +169,17 @@ async def configure_factory(config: FactoryConfig):
     """
     global _factory
     
+    # Provider configs are validated by FastAPI when parsing the body, so
+    # malformed entries are rejected with a 422 before reaching this point.
     try:
-        configs = []
-        for provider_config in config.providers:
-            configs.append(ModelConfig(**provider_config))
-        
-        _factory = LLMFactory(configs)
-        logger.info(f"Reconfigured factory with {len(configs)} providers")
+        # The previous factory is left open: requests that already hold it may
+        # still be using its clients, and a create() instance is shared
+        async with _get_factory_lock():
+            _factory = LLMFactory(config.providers)
+            _invalidate_caches()
+        logger.info(f"Reconfigured factory with {len(config.providers)} providers")
         
-        return {"message": "Factory reconfigured successfully", "providers": len(configs)}
+        return {"message": "Factory reconfigured successfully", "providers": len(config.providers)}
         
     except Exception as e:
         logger.error(f"Factory configuration error: {e}")
@@ -3,24 +3,68 @@ Main LLM Factory class with load balancing and unified interface.
 """
 
 import asyncio
+import copy
+import itertools
 import os
 import random
-import yaml
-from typing import Any, AsyncGenerator, Dict, List, Optional, Union
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Any, AsyncGenerator, Callable, Dict, Hashable, Iterator, List, Mapping, Optional, Tuple, Type, Union
 
 from loguru import logger
 from dotenv import load_dotenv
+from pydantic import TypeAdapter
 
-from .models import ChatMessage, ChatResponse, ModelConfig, StreamChunk
-from .providers import (
-    BaseProvider,
-    ClaudeProvider,
-    DeepSeekProvider,
-    GeminiProvider,
-    OpenAIProvider,
-    ProviderType,
-    QwenProvider,
-)
+from .models import ChatMessage, ChatResponse, MessageRole, ModelConfig, StreamChunk
+from . import providers as _providers
+from .providers import BaseProvider, ProviderType
+from .utils.config import _parse_yaml_file, _split_csv, load_config_from_env
+
+# Provider classes are resolved lazily from the providers package, so SDKs of
+# unused providers are never imported
+_PROVIDER_CLASS_NAMES: Mapping[ProviderType, str] = MappingProxyType({
+    ProviderType.OPENAI: "OpenAIProvider",
+    ProviderType.QWEN: "QwenProvider",
+    ProviderType.DEEPSEEK: "DeepSeekProvider",
+    ProviderType.CLAUDE: "ClaudeProvider",
+    ProviderType.GEMINI: "GeminiProvider",
+})
+
+_MODEL_CONFIG_LIST = TypeAdapter(List[ModelConfig])
+
+# "${VAR}" placeholders in YAML values
+_ENV_TEMPLATE_RE = re.compile(r'^\$\{([^}]+)\}$')
+# Keys whose comma-separated values expand into a list under "<key>s"
+_LIST_VALUED_KEYS = frozenset({'api_key', 'api_base'})
+# Keys handled per account rather than copied into every config
+_ACCOUNT_KEYS = frozenset({'provider', 'model_name', 'api_key', 'api_keys', 'api_base', 'api_bases'})
+
+
+# Circuit breaker backoff after consecutive failures: 1s, 2s, 4s, ... up to 60s
+_BREAKER_BASE_DELAY = 1.0
+_BREAKER_MAX_DELAY = 60.0
+
+# Upper bound on threads used to build providers in parallel
+_MAX_SETUP_WORKERS = 16
+
+
+def _build_provider(class_name: str, config: ModelConfig) -> BaseProvider:
+    """Import the named provider class if needed and instantiate it."""
+    provider_class: Type[BaseProvider] = getattr(_providers, class_name)
+    return provider_class(config)
+
+
+def _mtime_ns(path: str) -> int:
+    """Modification time of a file in nanoseconds, or 0 if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
 
 
 class LLMFactory:
@@ -30,72 +74,107 @@ class LLMFactory:
     Supports multiple providers with automatic failover and load balancing.
     """
     
-    _instance = None
+    # Serializes instance creation so concurrent callers share one factory
+    _create_lock = threading.Lock()
+    # (source kind, path) -> (file mtime, shared instance); an instance is
+    # dropped when it is closed so the next create() builds a fresh one
+    _instances: Dict[Tuple[str, str], Tuple[int, 'LLMFactory']] = {}
     
     @classmethod
     def create(cls, env_file: str = ".env") -> 'LLMFactory':
         """
         Create a LLMFactory instance with configuration from environment variables.
         
+        Instances are shared per env file and rebuilt when the file changes
+        or the shared instance has been closed.
+        
         Args:
             env_file: Path to the environment file. Defaults to ".env"
             
         Returns:
             LLMFactory instance
         """
-        if cls._instance is None:
+        def build() -> 'LLMFactory':
             load_dotenv(env_file)
-            configs = cls._load_configs_from_env()
-            cls._instance = cls(configs)
-        return cls._instance
+            return cls(cls._load_configs_from_env())
+        
+        return cls._shared_instance("env", env_file, build)
 
     @classmethod
     def create_from_config(cls, config_file: str) -> 'LLMFactory':
         """
         Create a LLMFactory instance with configuration from a YAML file.
         
+        Instances are shared per config file and rebuilt when the file changes
+        or the shared instance has been closed.
+        
         Args:
             config_file: Path to the YAML configuration file
             
         Returns:
             LLMFactory instance
         """
-        if cls._instance is None:
-            configs = cls._load_configs_from_yaml(config_file)
-            cls._instance = cls(configs)
-        return cls._instance
+        return cls._shared_instance(
+            "config", config_file, lambda: cls(cls._load_configs_from_yaml(config_file))
+        )
+
+    @classmethod
+    def _shared_instance(cls, kind: str, path: str, build: Callable[[], 'LLMFactory']) -> 'LLMFactory':
+        """Return the live instance built from path, building it if missing or stale."""
+        key = (kind, path)
+        mtime_ns = _mtime_ns(path)
+        with cls._create_lock:
+            cached = cls._instances.get(key)
+            if cached is not None and cached[0] == mtime_ns:
+                return cached[1]
+            instance = build()
+            cls._instances[key] = (mtime_ns, instance)
+            return instance
+
+    @classmethod
+    def _forget_instance(cls, instance: 'LLMFactory') -> None:
+        """Stop handing out instance from create() and create_from_config()."""
+        with cls._create_lock:
+            for key, (_, cached) in list(cls._instances.items()):
+                if cached is instance:
+                    del cls._instances[key]
 
     @staticmethod
     def _load_configs_from_yaml(config_file: str) -> List[ModelConfig]:
         """Load provider configurations from YAML file."""
-        if not os.path.exists(config_file):
-            raise FileNotFoundError(f"Configuration file not found: {config_file}")
+        try:
+            mtime_ns = os.stat(config_file).st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Configuration file not found: {config_file}") from None
 
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config_data = yaml.safe_load(f)
+        # 解析结果按修改时间缓存；复制一份，因为下面会就地替换环境变量
+        config_data = copy.deepcopy(_parse_yaml_file(os.path.abspath(config_file), mtime_ns))
 
         if not config_data or 'providers' not in config_data:
             raise ValueError("Invalid configuration file: 'providers' section not found")
 
-        configs = []
+        config_dicts = []
         for provider_config in config_data['providers']:
             provider_type = provider_config.get('provider', '').upper()
             if not provider_type or not hasattr(ProviderType, provider_type):
                 logger.warning(f"Skipping invalid provider type: {provider_type}")
                 continue
 
-            # 处理环境变量替换
-            for key, value in provider_config.items():
-                if isinstance(value, str) and value.startswith('${') and value.endswith('}'):
-                    env_var = value[2:-1]
-                    env_value = os.getenv(env_var)
-                    if env_value:
-                        if ',' in env_value:  # 处理多个值的情况
-                            provider_config[key + 's'] = [v.strip() for v in env_value.split(',') if v.strip()]
-                        else:
-                            provider_config[key] = env_value
+            # 处理环境变量替换（不含 '$' 的配置直接跳过）
+            if any(isinstance(value, str) and '$' in value for value in provider_config.values()):
+                resolved = {}
+                for key, value in provider_config.items():
+                    match = _ENV_TEMPLATE_RE.match(value) if isinstance(value, str) else None
+                    if not match:
+                        continue
+                    env_value = os.getenv(match.group(1))
+                    if not env_value:
+                        logger.warning(f"Environment variable not found: {match.group(1)}")
+                    elif key in _LIST_VALUED_KEYS and ',' in env_value:  # 处理多个值的情况
+                        resolved[key + 's'] = _split_csv(env_value)
                     else:
-                        logger.warning(f"Environment variable not found: {env_var}")
+                        resolved[key] = env_value
+                provider_config.update(resolved)
 
             # 处理多账户配置
             api_keys = provider_config.get('api_keys', [provider_config.get('api_key')])
@@ -112,113 +191,40 @@ class LLMFactory:
             elif len(api_bases) > 1 and len(api_keys) == 1:
                 api_keys = api_keys * len(api_bases)
 
+            # 其他配置参数对所有账户相同，只需收集一次
+            shared = {
+                key: value for key, value in provider_config.items()
+                if key not in _ACCOUNT_KEYS
+            }
+            shared['provider'] = getattr(ProviderType, provider_type)
+            shared['model_name'] = provider_config.get('model_name')
+
             # 为每个API密钥创建一个配置
             for i, api_key in enumerate(api_keys):
                 if not api_key:
                     continue
 
-                config_dict = {
-                    'provider': getattr(ProviderType, provider_type),
-                    'model_name': provider_config.get('model_name'),
-                    'api_key': api_key,
-                }
+                config_dict = {**shared, 'api_key': api_key}
 
                 # 添加API base（如果存在）
                 if i < len(api_bases) and api_bases[i]:
                     config_dict['api_base'] = api_bases[i]
 
-                # 添加其他配置参数
-                for key, value in provider_config.items():
-                    if key not in ['provider', 'model_name', 'api_key', 'api_keys', 'api_base', 'api_bases']:
-                        config_dict[key] = value
-
-                configs.append(ModelConfig(**config_dict))
+                config_dicts.append(config_dict)
 
-        if not configs:
+        if not config_dicts:
             raise ValueError("No valid provider configurations found in YAML file")
 
-        return configs
+        # 一次性校验全部配置
+        return _MODEL_CONFIG_LIST.validate_python(config_dicts)
 
     @staticmethod
     def _load_configs_from_env() -> List[ModelConfig]:
         """Load provider configurations from environment variables."""
-        configs = []
-        
-        # OpenAI配置
-        openai_keys = [k.strip() for k in os.getenv("OPENAI_API_KEYS", "").split(",") if k.strip()]
-        openai_bases = [b.strip() for b in os.getenv("OPENAI_API_BASES", "").split(",") if b.strip()]
-        
-        if not openai_keys and os.getenv("OPENAI_API_KEY"):  # 兼容单个key的情况
-            openai_keys = [os.getenv("OPENAI_API_KEY")]
-            openai_bases = [os.getenv("OPENAI_API_BASE")] if os.getenv("OPENAI_API_BASE") else []
-        
-        if len(openai_keys) == len(openai_bases) and openai_keys:
-            for api_key, api_base in zip(openai_keys, openai_bases):
-                configs.append(ModelConfig(
-                    provider=ProviderType.OPENAI,
-                    model_name=os.getenv("OPENAI_MODEL", "gpt-4o"),
-                    api_key=api_key,
-                    api_base=api_base,
-                    api_version=os.getenv("OPENAI_API_VERSION", "2024-02-15-preview"),
-                ))
-        
-        # Qwen配置
-        qwen_keys = [k.strip() for k in os.getenv("QWEN_API_KEYS", "").split(",") if k.strip()]
-        if not qwen_keys and os.getenv("QWEN_API_KEY"):
-            qwen_keys = [os.getenv("QWEN_API_KEY")]
-            
-        for api_key in qwen_keys:
-            configs.append(ModelConfig(
-                provider=ProviderType.QWEN,
-                model_name=os.getenv("QWEN_MODEL", "qwen-turbo"),
-                api_key=api_key,
-                api_base=os.getenv("QWEN_API_BASE"),
-            ))
-        
-        # Deepseek配置
-        deepseek_keys = [k.strip() for k in os.getenv("DEEPSEEK_API_KEYS", "").split(",") if k.strip()]
-        if not deepseek_keys and os.getenv("DEEPSEEK_API_KEY"):
-            deepseek_keys = [os.getenv("DEEPSEEK_API_KEY")]
-            
-        for api_key in deepseek_keys:
-            configs.append(ModelConfig(
-                provider=ProviderType.DEEPSEEK,
-                model_name=os.getenv("DEEPSEEK_MODEL", "deepseek-chat"),
-                api_key=api_key,
-                api_base=os.getenv("DEEPSEEK_API_BASE"),
-            ))
-        
-        # Claude配置
-        claude_keys = [k.strip() for k in os.getenv("CLAUDE_ACCESS_KEYS", "").split(",") if k.strip()]
-        if not claude_keys and os.getenv("CLAUDE_ACCESS_KEY"):
-            claude_keys = [os.getenv("CLAUDE_ACCESS_KEY")]
-            
-        for api_key in claude_keys:
-            configs.append(ModelConfig(
-                provider=ProviderType.CLAUDE,
-                model_name=os.getenv("CLAUDE_MODEL", "anthropic.claude-3-5-sonnet-20241022-v2:0"),
-                api_key=api_key,
-                api_base=os.getenv("CLAUDE_SECRET_KEY"),
-                region=os.getenv("CLAUDE_REGION", "us-east-1"),
-            ))
-        
-        # Gemini配置
-        gemini_keys = [k.strip() for k in os.getenv("GEMINI_API_KEYS", "").split(",") if k.strip()]
-        if not gemini_keys and os.getenv("GEMINI_API_KEY"):
-            gemini_keys = [os.getenv("GEMINI_API_KEY")]
-            
-        for api_key in gemini_keys:
-            configs.append(ModelConfig(
-                provider=ProviderType.GEMINI,
-                model_name=os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp"),
-                api_key=api_key,
-                project_id=os.getenv("GEMINI_PROJECT_ID"),
-                region=os.getenv("GEMINI_REGION"),
-            ))
-        
+        # 每次返回新的副本，缓存中的配置不会被调用方修改
+        configs = load_config_from_env()
         if not configs:
             raise ValueError("No valid provider configurations found in environment variables")
-        
         return configs
     
     def __init__(self, configs: Union[ModelConfig, List[ModelConfig]]):
@@ -237,104 +243,235 @@ class LLMFactory:
         
         if not self.providers:
             raise ValueError("No valid providers could be initialized")
+        
+        # Per-provider fields in provider order, read by get_provider_status()
+        self._provider_type_names = tuple(p.__class__.__name__ for p in self.providers)
+        self._model_names = tuple(p.config.model_name for p in self.providers)
+        self._provider_names = tuple(p.config.provider for p in self.providers)
+        # id(provider) -> position in self.providers, used to order failover
+        self._provider_positions = {id(p): i for i, p in enumerate(self.providers)}
+        
+        # Round-robin iterators over all providers and over provider subsets
+        self._rr_iter: Iterator[BaseProvider] = itertools.cycle(self.providers)
+        self._sublist_cycles: Dict[Hashable, Iterator[BaseProvider]] = {}
+        # Private generator for the "random" and "p2c" strategies
+        self._rng = random.Random()
+        # Requests currently running on each provider, used by "p2c"
+        self._in_flight = [0] * len(self.providers)
+        # Circuit breaker: consecutive failures per provider and the
+        # time.monotonic() deadline until which it is skipped (0.0 = closed)
+        self._failures = [0] * len(self.providers)
+        self._open_until = [0.0] * len(self.providers)
+        # Background event loop serving the synchronous chat() interface,
+        # started on first use
+        self._sync_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_thread: Optional[threading.Thread] = None
+        self._sync_lock = threading.Lock()
     
     def _setup_providers(self) -> None:
         """Setup all providers based on configurations."""
-        provider_map = {
-            ProviderType.OPENAI: OpenAIProvider,
-            ProviderType.QWEN: QwenProvider,
-            ProviderType.DEEPSEEK: DeepSeekProvider,
-            ProviderType.CLAUDE: ClaudeProvider,
-            ProviderType.GEMINI: GeminiProvider,
-        }
+        self._by_model: Dict[str, List[BaseProvider]] = {}
         
+        known = []
         for config in self.configs:
+            class_name = _PROVIDER_CLASS_NAMES.get(config.provider)
+            if class_name is None:
+                logger.warning(f"Unknown provider: {config.provider}")
+            else:
+                known.append((config, class_name))
+        if not known:
+            return
+        
+        # Client setup (SDK imports, credential resolution) can block, so
+        # build providers concurrently; results are consumed in config order
+        with ThreadPoolExecutor(max_workers=min(len(known), _MAX_SETUP_WORKERS)) as executor:
+            futures = [
+                executor.submit(_build_provider, class_name, config)
+                for config, class_name in known
+            ]
+        
+        for future, (config, _) in zip(futures, known):
             try:
-                provider_class = provider_map.get(config.provider)
-                if provider_class:
-                    provider = provider_class(config)
-                    self.providers.append(provider)
-                    logger.info(f"Initialized {config.provider} provider with model {config.model_name}")
-                else:
-                    logger.warning(f"Unknown provider: {config.provider}")
+                provider = future.result()
+                self.providers.append(provider)
+                # model_name -> providers serving it, for per-request routing
+                self._by_model.setdefault(config.model_name, []).append(provider)
+                logger.info(f"Initialized {config.provider} provider with model {config.model_name}")
             except ImportError as e:
                 logger.warning(f"Skipping {config.provider} provider due to missing dependencies: {e}")
             except Exception as e:
                 logger.error(f"Failed to initialize {config.provider} provider: {e}")
     
-    def _get_provider_for_model(self, model_name: Optional[str] = None, strategy: str = "round_robin") -> BaseProvider:
+    def _select_provider(self, messages: List[ChatMessage], kwargs: Dict[str, Any]) -> BaseProvider:
+        """Pick the provider for a request from its model and load balancing options."""
+        strategy = kwargs.get("load_balance_strategy", "round_robin")
+        affinity_key = None
+        if strategy == "sticky":
+            # Without a session id, pin on the first user turn so a conversation
+            # keeps landing on the same provider; the system prompt is shared
+            # by most requests, so keying on it would send them all to one
+            affinity_key = kwargs.get("session_id") or next(
+                (m.content for m in messages if m.role == MessageRole.USER), None
+            )
+        
+        model_name = kwargs.get("model")
+        if model_name:
+            provider = self._get_provider_for_model(model_name, strategy, affinity_key)
+            candidates = self._by_model.get(model_name) or self.providers
+        else:
+            provider = self._get_provider(strategy, affinity_key)
+            candidates = self.providers
+        
+        if self._is_open(provider):
+            # Route around a tripped provider; if every candidate is tripped,
+            # let the original pick through as a probe
+            for candidate in candidates:
+                if not self._is_open(candidate):
+                    return candidate
+        return provider
+    
+    def _is_open(self, provider: BaseProvider) -> bool:
+        """Whether provider's circuit breaker is currently open."""
+        open_until = self._open_until[self._provider_positions[id(provider)]]
+        return open_until > 0.0 and open_until > time.monotonic()
+    
+    def _get_provider_for_model(
+        self,
+        model_name: Optional[str] = None,
+        strategy: str = "round_robin",
+        affinity_key: Optional[str] = None,
+    ) -> BaseProvider:
         """
         Get a provider that supports the specified model with load balancing.
         
         Args:
             model_name: The model name to find a provider for
             strategy: Load balancing strategy to use among matching providers
+            affinity_key: Key that pins requests to one provider with the "sticky" strategy
         """
         if not self.providers:
             raise RuntimeError("No providers available")
         
         if model_name:
-            matching_providers = [
-                provider for provider in self.providers 
-                if provider.config.model_name == model_name
-            ]
+            matching_providers = self._by_model.get(model_name)
             
             if matching_providers:
-                return self._get_provider_from_list(matching_providers, strategy)
+                return self._get_provider_from_list(
+                    matching_providers, strategy, key=model_name, affinity_key=affinity_key
+                )
             
             logger.warning(f"No provider found for model {model_name}, using all providers for load balancing")
         
-        return self._get_provider(strategy)
-    def _get_provider_from_list(self, providers: List[BaseProvider], strategy: str = "round_robin") -> BaseProvider:
+        return self._get_provider(strategy, affinity_key)
+    
+    def _get_provider_from_list(
+        self,
+        providers: List[BaseProvider],
+        strategy: str = "round_robin",
+        key: Optional[Hashable] = None,
+        affinity_key: Optional[str] = None,
+    ) -> BaseProvider:
         """
         Get a provider from a specific list using load balancing strategy.
         
         Args:
             providers: List of providers to choose from
-            strategy: Load balancing strategy ('round_robin', 'random', 'first_available')
+            strategy: Load balancing strategy ('round_robin', 'random', 'first_available', 'p2c', 'least_busy', 'sticky')
+            key: Stable key identifying the list for round-robin state; defaults
+                to the identities of the providers in it
+            affinity_key: Key that pins requests to one provider with the "sticky" strategy
         """
         if not providers:
             raise RuntimeError("No providers available in list")
         
         if strategy == "random":
-            return random.choice(providers)
+            return self._rng.choice(providers)
+        elif strategy == "p2c":
+            return self._pick_least_loaded(providers)
+        elif strategy == "sticky" and affinity_key:
+            return providers[zlib.crc32(affinity_key.encode()) % len(providers)]
         elif strategy == "first_available":
             return providers[0]
-        else:  # round_robin (default)
-            list_id = id(providers)
-            if not hasattr(self, '_provider_list_indices'):
-                self._provider_list_indices = {}
-            
-            if list_id not in self._provider_list_indices:
-                self._provider_list_indices[list_id] = 0
-            
-            provider = providers[self._provider_list_indices[list_id]]
-            self._provider_list_indices[list_id] = (self._provider_list_indices[list_id] + 1) % len(providers)
-            return provider
-
-
+        
+        # round_robin (default); also the tie-breaker for least_busy
+        if key is None:
+            key = tuple(id(provider) for provider in providers)
+        rr_iter = self._sublist_cycles.get(key)
+        if rr_iter is None:
+            rr_iter = self._sublist_cycles[key] = itertools.cycle(providers)
+        provider = next(rr_iter)
+        if strategy == "least_busy":
+            return self._pick_least_busy(providers, provider)
+        return provider
     
-    def _get_provider(self, strategy: str = "round_robin") -> BaseProvider:
+    def _get_provider(self, strategy: str = "round_robin", affinity_key: Optional[str] = None) -> BaseProvider:
         """
         Get a provider based on load balancing strategy.
         
         Args:
-            strategy: Load balancing strategy ('round_robin', 'random', 'first_available')
+            strategy: Load balancing strategy ('round_robin', 'random', 'first_available', 'p2c', 'least_busy', 'sticky')
+            affinity_key: Key that pins requests to one provider with the "sticky" strategy
         """
         if not self.providers:
             raise RuntimeError("No providers available")
         
         if strategy == "random":
-            return random.choice(self.providers)
+            return self._rng.choice(self.providers)
+        elif strategy == "p2c":
+            return self._pick_least_loaded(self.providers)
+        elif strategy == "sticky" and affinity_key:
+            return self.providers[zlib.crc32(affinity_key.encode()) % len(self.providers)]
         elif strategy == "first_available":
             return self.providers[0]
+        elif strategy == "least_busy":
+            return self._pick_least_busy(self.providers, next(self._rr_iter))
         else:  # round_robin (default)
-            if not hasattr(self, '_current_provider_index'):
-                self._current_provider_index = 0
-            
-            provider = self.providers[self._current_provider_index]
-            self._current_provider_index = (self._current_provider_index + 1) % len(self.providers)
-            return provider
+            return next(self._rr_iter)
+    
+    def _pick_least_busy(self, providers: List[BaseProvider], default: BaseProvider) -> BaseProvider:
+        """Provider with the fewest requests in flight; ties keep default."""
+        in_flight, positions = self._in_flight, self._provider_positions
+        best, best_load = default, in_flight[positions[id(default)]]
+        for provider in providers:
+            load = in_flight[positions[id(provider)]]
+            if load < best_load:
+                best, best_load = provider, load
+        return best
+    
+    def _pick_least_loaded(self, providers: List[BaseProvider]) -> BaseProvider:
+        """Power of two choices: sample two providers, keep the less busy one."""
+        if len(providers) < 2:
+            return providers[0]
+        
+        a, b = self._rng.sample(providers, 2)
+        positions = self._provider_positions
+        if self._in_flight[positions[id(a)]] <= self._in_flight[positions[id(b)]]:
+            return a
+        return b
+    
+    @contextmanager
+    def _track_call(self, provider: BaseProvider) -> Iterator[None]:
+        """
+        Track a call to provider.
+        
+        Counts it as in flight for its duration and updates the circuit
+        breaker: a failure opens it with exponential backoff, a success
+        closes it.
+        """
+        idx = self._provider_positions[id(provider)]
+        self._in_flight[idx] += 1
+        try:
+            yield
+        except Exception:
+            self._failures[idx] += 1
+            backoff = _BREAKER_BASE_DELAY * 2 ** min(self._failures[idx] - 1, 16)
+            self._open_until[idx] = time.monotonic() + min(backoff, _BREAKER_MAX_DELAY)
+            raise
+        else:
+            self._failures[idx] = 0
+            self._open_until[idx] = 0.0
+        finally:
+            self._in_flight[idx] -= 1
     
     def chat(
         self,
@@ -352,10 +489,11 @@ class LLMFactory:
             RuntimeError: If called from within an async context. Use chat_async() instead.
         """
         try:
-            loop = asyncio.get_running_loop()
+            asyncio.get_running_loop()
         except RuntimeError:
-            # 如果没有运行中的事件循环，创建一个新的
-            return asyncio.run(self.chat_async(messages, **kwargs))
+            # 没有运行中的事件循环时，交给后台事件循环执行（连接池也随之复用）
+            future = asyncio.run_coroutine_threadsafe(self.chat_async(messages, **kwargs), self._get_sync_loop())
+            return future.result()
         
         # 如果已经在事件循环中，应该使用异步方法
         raise RuntimeError(
@@ -363,6 +501,18 @@ class LLMFactory:
             "Use await chat_async() instead."
         )
     
+    def _get_sync_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the background event loop used by chat(), starting it if needed."""
+        with self._sync_lock:
+            if self._sync_loop is None:
+                loop = asyncio.new_event_loop()
+                self._sync_thread = threading.Thread(
+                    target=loop.run_forever, name="llm-factory-sync", daemon=True
+                )
+                self._sync_thread.start()
+                self._sync_loop = loop
+            return self._sync_loop
+    
     async def chat_async(
         self,
         messages: Union[str, List[ChatMessage]],
@@ -376,17 +526,20 @@ class LLMFactory:
             **kwargs: Additional parameters (temperature, max_tokens, etc.)
         """
         if isinstance(messages, str):
-            messages = [ChatMessage(role="user", content=messages)]
+            # The shape is known, so skip pydantic validation
+            messages = [ChatMessage.model_construct(role=MessageRole.USER, content=messages)]
         
-        model_name = kwargs.get("model")
-        strategy = kwargs.get("load_balance_strategy", "round_robin")
-        if model_name:
-            provider = self._get_provider_for_model(model_name, strategy)
-        else:
-            provider = self._get_provider(strategy)
+        hedge = kwargs.pop("hedge", False)
+        # Serialized request bodies shared by every attempt at this request
+        kwargs["body_cache"] = {}
+        provider = self._select_provider(messages, kwargs)
+        partner = self._hedge_partner(provider, kwargs.get("model")) if hedge else None
         
         try:
-            result = await provider.chat_completion(messages, **kwargs)
+            if partner is not None:
+                return await self._hedged_chat((provider, partner), messages, **kwargs)
+            with self._track_call(provider):
+                result = await provider.chat_completion(messages, **kwargs)
             if isinstance(result, ChatResponse):
                 return result
             else:
@@ -395,7 +548,7 @@ class LLMFactory:
             logger.error(f"Chat completion failed with {provider.__class__.__name__}: {e}")
             if len(self.providers) > 1:
                 logger.info("Attempting failover to next provider")
-                return await self._failover_chat(messages, provider, **kwargs)
+                return await self._failover_chat(messages, self._provider_positions[id(provider)], **kwargs)
             raise
     
     def stream(
@@ -425,62 +578,107 @@ class LLMFactory:
             **kwargs: Additional parameters (temperature, max_tokens, etc.)
         """
         if isinstance(messages, str):
-            messages = [ChatMessage(role="user", content=messages)]
+            # The shape is known, so skip pydantic validation
+            messages = [ChatMessage.model_construct(role=MessageRole.USER, content=messages)]
         
-        model_name = kwargs.get("model")
-        strategy = kwargs.get("load_balance_strategy", "round_robin")
-        if model_name:
-            provider = self._get_provider_for_model(model_name, strategy)
-        else:
-            provider = self._get_provider(strategy)
+        kwargs.pop("hedge", None)  # streams are never hedged
+        kwargs["body_cache"] = {}
+        provider = self._select_provider(messages, kwargs)
         
         try:
-            async for chunk in provider.chat_completion_stream(messages, **kwargs):
-                yield chunk
+            with self._track_call(provider):
+                async for chunk in provider.chat_completion_stream(messages, **kwargs):
+                    yield chunk
         except Exception as e:
             logger.error(f"Streaming failed with {provider.__class__.__name__}: {e}")
             if len(self.providers) > 1:
                 logger.info("Attempting failover to next provider")
-                async for chunk in self._failover_stream(messages, provider, **kwargs):
+                async for chunk in self._failover_stream(messages, self._provider_positions[id(provider)], **kwargs):
                     yield chunk
             else:
                 raise
     
+    def _failover_order(self, failed_idx: int) -> Iterator[BaseProvider]:
+        """Yield every other provider not tripped, starting after failed_idx."""
+        n = len(self.providers)
+        for i in range(failed_idx + 1, failed_idx + n):
+            provider = self.providers[i % n]
+            if not self._is_open(provider):
+                yield provider
+    
+    def _hedge_partner(self, provider: BaseProvider, model_name: Optional[str]) -> Optional[BaseProvider]:
+        """Provider to race against provider for a hedged request, if any."""
+        for candidate in self._failover_order(self._provider_positions[id(provider)]):
+            if not model_name or candidate.config.model_name == model_name:
+                return candidate
+        return None
+    
+    async def _hedged_chat(
+        self,
+        providers: Tuple[BaseProvider, ...],
+        messages: List[ChatMessage],
+        **kwargs: Any
+    ) -> ChatResponse:
+        """Send the same request to every provider and return the first success."""
+        async def call(provider: BaseProvider) -> ChatResponse:
+            with self._track_call(provider):
+                result = await provider.chat_completion(messages, **kwargs)
+            if not isinstance(result, ChatResponse):
+                raise ValueError("Expected ChatResponse but got streaming response")
+            return result
+        
+        tasks = [asyncio.ensure_future(call(provider)) for provider in providers]
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    logger.error(f"Hedged request failed: {error}")
+            raise error
+        finally:
+            # Losers are cancelled; their in-flight counts unwind in _track_call
+            for task in pending:
+                task.cancel()
+    
     async def _failover_chat(
         self,
         messages: List[ChatMessage],
-        failed_provider: BaseProvider,
+        failed_idx: int,
         **kwargs: Any
     ) -> ChatResponse:
         """Failover to next available provider for chat completion."""
-        for provider in self.providers:
-            if provider != failed_provider:
-                try:
+        for provider in self._failover_order(failed_idx):
+            try:
+                with self._track_call(provider):
                     result = await provider.chat_completion(messages, **kwargs)
-                    if isinstance(result, ChatResponse):
-                        return result
-                except Exception as e:
-                    logger.error(f"Failover failed with {provider.__class__.__name__}: {e}")
-                    continue
+                if isinstance(result, ChatResponse):
+                    return result
+            except Exception as e:
+                logger.error(f"Failover failed with {provider.__class__.__name__}: {e}")
+                continue
         
         raise RuntimeError("All providers failed")
     
     async def _failover_stream(
         self,
         messages: List[ChatMessage],
-        failed_provider: BaseProvider,
+        failed_idx: int,
         **kwargs: Any
     ) -> AsyncGenerator[StreamChunk, None]:
         """Failover to next available provider for streaming."""
-        for provider in self.providers:
-            if provider != failed_provider:
-                try:
+        for provider in self._failover_order(failed_idx):
+            try:
+                with self._track_call(provider):
                     async for chunk in provider.chat_completion_stream(messages, **kwargs):
                         yield chunk
-                    return
-                except Exception as e:
-                    logger.error(f"Streaming failover failed with {provider.__class__.__name__}: {e}")
-                    continue
+                return
+            except Exception as e:
+                logger.error(f"Streaming failover failed with {provider.__class__.__name__}: {e}")
+                continue
         
         raise RuntimeError("All providers failed")
     
@@ -498,20 +696,46 @@ class LLMFactory:
         """
         return self.chat(messages, **kwargs)
     
+    async def aclose(self) -> None:
+        """Close all providers and release their network resources."""
+        # A closed factory must not be returned by a later create()
+        self._forget_instance(self)
+        for provider in self.providers:
+            try:
+                await provider.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close {provider.__class__.__name__}: {e}")
+    
+    def close(self) -> None:
+        """
+        Synchronous counterpart of aclose().
+        
+        Also stops the background event loop started by chat().
+        """
+        with self._sync_lock:
+            loop, thread = self._sync_loop, self._sync_thread
+            self._sync_loop = self._sync_thread = None
+        
+        if loop is None:
+            asyncio.run(self.aclose())
+            return
+        
+        try:
+            asyncio.run_coroutine_threadsafe(self.aclose(), loop).result()
+            asyncio.run_coroutine_threadsafe(loop.shutdown_asyncgens(), loop).result()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+    
     def get_provider_status(self) -> Dict[str, Any]:
         """Get status information about all providers."""
-        status = {
+        return {
             "total_providers": len(self.providers),
-            "providers": []
+            "providers": [
+                {"index": i, "type": type_name, "model": model, "provider": provider}
+                for i, (type_name, model, provider) in enumerate(
+                    zip(self._provider_type_names, self._model_names, self._provider_names)
+                )
+            ],
         }
-        
-        for i, provider in enumerate(self.providers):
-            provider_info = {
-                "index": i,
-                "type": provider.__class__.__name__,
-                "model": provider.config.model_name,
-                "provider": provider.config.provider,
-            }
-            status["providers"].append(provider_info)
-        
-        return status
@@ -36,6 +36,13 @@ class ProxyConfig(BaseModel):
         return result
 
 
+class HttpLimits(BaseModel):
+    """Connection pool limits for provider HTTP clients."""
+    max_connections: Optional[int] = 100
+    max_keepalive_connections: Optional[int] = 20
+    keepalive_expiry: Optional[float] = 5.0
+
+
 class ChatMessage(BaseModel):
     """A single chat message."""
     role: MessageRole
@@ -74,7 +81,7 @@ class StreamChunk(BaseModel):
     usage: Optional[Usage] = None
 
 
-LoadBalanceStrategy = Literal["round_robin", "random", "first_available"]
+LoadBalanceStrategy = Literal["round_robin", "random", "first_available", "p2c", "least_busy", "sticky"]
 ProviderName = Literal["openai", "qwen", "deepseek", "claude", "gemini"]
 
 
@@ -88,12 +95,19 @@ class ModelConfig(BaseModel):
     region: Optional[str] = None
     project_id: Optional[str] = None
     proxy_config: Optional[Union[ProxyConfig, Dict[str, str]]] = None
+    http_limits: Optional[HttpLimits] = None
+    http2: bool = False  # Multiplex requests over HTTP/2 (needs httpx[http2])
     max_tokens: Optional[int] = None
     temperature: Optional[float] = None
     top_p: Optional[float] = None
     stream: bool = False
     timeout: int = 60
     max_retries: int = 3
+    response_cache_size: int = 0  # Cached temperature-0 responses per provider (0 disables)
+    response_cache_ttl: float = 300.0  # Seconds a cached response stays valid
+    response_cache_redis_url: Optional[str] = None  # Share the cache between workers through Redis
+    max_concurrency: Optional[int] = None  # Requests in flight per provider (None = unlimited)
+    tpm: Optional[int] = None  # Tokens per minute budget per provider (None = unlimited)
 
 
 class ToolCall(BaseModel):
@@ -133,3 +147,6 @@ class ChatCompletionRequest(BaseModel):
     tools: Optional[List[Tool]] = None
     tool_choice: Optional[Union[str, Dict[str, Any]]] = None
     response_format: Optional[Dict[str, str]] = None
+    load_balance_strategy: Optional[LoadBalanceStrategy] = None
+    session_id: Optional[str] = None  # Pins a conversation to one provider with "sticky"
+    hedge: Optional[bool] = None  # Race two providers and keep the first answer (costs double)
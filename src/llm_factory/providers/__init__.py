@@ -2,7 +2,9 @@
 Provider implementations for different LLM services.
 """
 
+import importlib
 from enum import Enum
+from typing import TYPE_CHECKING, Any
 
 
 class ProviderType(str, Enum):
@@ -15,11 +17,13 @@ class ProviderType(str, Enum):
 
 
 from .base import BaseProvider
-from .openai_provider import OpenAIProvider
-from .qwen_provider import QwenProvider
-from .deepseek_provider import DeepSeekProvider
-from .claude_provider import ClaudeProvider
-from .gemini_provider import GeminiProvider
+
+if TYPE_CHECKING:
+    from .claude_provider import ClaudeProvider
+    from .deepseek_provider import DeepSeekProvider
+    from .gemini_provider import GeminiProvider
+    from .openai_provider import OpenAIProvider
+    from .qwen_provider import QwenProvider
 
 __all__ = [
     "ProviderType",
@@ -30,3 +34,26 @@ __all__ = [
     "ClaudeProvider",
     "GeminiProvider",
 ]
+
+# Provider classes are imported on first access so that only the SDKs of the
+# providers actually in use (e.g. boto3 for Claude) get loaded.
+_LAZY_ATTRS = {
+    "OpenAIProvider": ".openai_provider",
+    "QwenProvider": ".qwen_provider",
+    "DeepSeekProvider": ".deepseek_provider",
+    "ClaudeProvider": ".claude_provider",
+    "GeminiProvider": ".gemini_provider",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
@@ -2,18 +2,199 @@
 Base provider class for LLM implementations.
 """
 
+import asyncio
+import functools
+import hashlib
+import importlib.util
+import inspect
+import itertools
+import operator
+import os
 import time
+import unicodedata
 from abc import ABC, abstractmethod
-from typing import Any, AsyncGenerator, Dict, List, Optional, Union
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple, Union
 
-from ..models import ChatMessage, ChatResponse, ModelConfig, StreamChunk, Usage
+import httpx
+import orjson
+from loguru import logger
+from pydantic import BaseModel
+
+from ..models import ChatMessage, ChatResponse, HttpLimits, MessageRole, ModelConfig, StreamChunk, Usage
+from .cache import build_cache
+
+
+def _new_id_prefix() -> str:
+    """Per-process prefix for generated response ids."""
+    return f"chatcmpl-{os.getpid():x}-{time.time_ns():x}-"
+
+
+_id_prefix = _new_id_prefix()
+_id_counter = itertools.count()
+
+
+def _reset_id_prefix() -> None:
+    global _id_prefix
+    _id_prefix = _new_id_prefix()
+
+
+if hasattr(os, "register_at_fork"):
+    # Forked workers must not hand out the parent's ids
+    os.register_at_fork(after_in_child=_reset_id_prefix)
+
+# Nano-dollars per US dollar; prices and costs are summed as integers in this unit
+_NANO_USD = 1_000_000_000
+
+# Request options that change a completion, and so belong in its cache key
+_CACHE_KEY_OPTIONS = ("temperature", "top_p", "max_tokens", "tools", "tool_choice", "response_format")
+
+# Field name of server-sent event payload lines
+_SSE_DATA = b"data:"
+_SSE_DATA_LEN = len(_SSE_DATA)
+
+
+# Role strings by member; a dict hit is several times cheaper than Enum.value
+_ROLE_VALUES: Mapping[MessageRole, str] = {role: role.value for role in MessageRole}
+
+_message_fields = operator.attrgetter("role", "content", "name", "tool_calls", "tool_call_id")
+
+
+def _message_dict(msg: ChatMessage) -> Dict[str, Any]:
+    """OpenAI-style dict for one message; optional fields only when set."""
+    role, content, name, tool_calls, tool_call_id = _message_fields(msg)
+    item = {"role": _ROLE_VALUES[role], "content": content}
+    if name is not None:
+        item["name"] = name
+    if tool_calls is not None:
+        item["tool_calls"] = tool_calls
+    if tool_call_id is not None:
+        item["tool_call_id"] = tool_call_id
+    return item
+
+
+def _dump_model(obj: Any) -> Any:
+    """orjson fallback for pydantic models inside request options."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError
+
+
+async def iter_sse_data(response: httpx.Response) -> AsyncIterator[bytes]:
+    """
+    Yield the payload of each ``data:`` line of a server-sent event stream.
+    
+    Works on the raw bytes so no line is decoded to str; a line split across
+    network chunks stays in the buffer until its newline arrives.
+    """
+    buf = bytearray()
+    async for chunk in response.aiter_bytes():
+        buf += chunk
+        start = 0
+        while (end := buf.find(b"\n", start)) != -1:
+            # Every event ends in a blank line; the length test drops those
+            # (and "data:" with no payload) before any prefix match
+            if end - start > _SSE_DATA_LEN and buf.startswith(_SSE_DATA, start):
+                data = bytes(buf[start + _SSE_DATA_LEN:end]).strip()
+                if data:
+                    yield data
+            start = end + 1
+        del buf[:start]
+    
+    if buf.startswith(_SSE_DATA):
+        data = bytes(buf[_SSE_DATA_LEN:]).strip()
+        if data:
+            yield data
+
+
+class TokenBucket:
+    """Tokens-per-minute budget shared by the requests of one provider."""
+    
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    async def acquire(self, tokens: int) -> None:
+        """Wait until tokens are available, then spend them."""
+        # A request larger than the whole budget only waits for a full bucket
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return
+            await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+def throttle(method: Callable[..., Any]) -> Callable[..., Any]:
+    """Apply the provider's max_concurrency and tpm limits to a request method."""
+    if inspect.isasyncgenfunction(method):
+        @functools.wraps(method)
+        async def stream_wrapper(self: "BaseProvider", messages: List[ChatMessage], **kwargs: Any) -> Any:
+            async with self._throttled(messages, kwargs):
+                async for chunk in method(self, messages, **kwargs):
+                    yield chunk
+        
+        return stream_wrapper
+    
+    @functools.wraps(method)
+    async def wrapper(self: "BaseProvider", messages: List[ChatMessage], **kwargs: Any) -> Any:
+        if kwargs.get("stream", self.config.stream):
+            # Only hands back chat_completion_stream(), which is throttled itself
+            return await method(self, messages, **kwargs)
+        async with self._throttled(messages, kwargs):
+            return await method(self, messages, **kwargs)
+    
+    return wrapper
+
+
+def cache_responses(
+    chat_completion: Callable[..., Awaitable[Any]]
+) -> Callable[..., Awaitable[Any]]:
+    """Serve repeated deterministic requests from the provider's response cache."""
+    @functools.wraps(chat_completion)
+    async def wrapper(self: "BaseProvider", messages: List[ChatMessage], **kwargs: Any) -> Any:
+        key = self._response_cache_key(messages, kwargs)
+        if key is None:
+            return await chat_completion(self, messages, **kwargs)
+        
+        cached = await self._cached_response(key)
+        if cached is not None:
+            return cached
+        
+        response = await chat_completion(self, messages, **kwargs)
+        if isinstance(response, ChatResponse):
+            await self._store_response(key, response)
+        return response
+    
+    return wrapper
 
 
 class BaseProvider(ABC):
     """Base class for all LLM providers."""
     
+    __slots__ = ("config", "client", "_prices", "_response_cache", "saved_tokens", "_semaphore", "_token_bucket")
+    
+    # Prices in USD per 1K tokens, keyed by lowercase model name
+    _INPUT_COSTS_PER_1K: Mapping[str, float] = {}
+    _OUTPUT_COSTS_PER_1K: Mapping[str, float] = {}
+    # Temperature sent when neither the request nor the config sets one
+    # (None leaves it to the upstream API)
+    _DEFAULT_TEMPERATURE: Optional[float] = None
+    
     def __init__(self, config: ModelConfig):
         self.config = config
+        self._prices: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._response_cache = build_cache(config)
+        # Tokens not sent upstream thanks to cache hits
+        self.saved_tokens = 0
+        # Request limits; the semaphore is created on first use inside a loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._token_bucket = TokenBucket(config.tpm) if config.tpm else None
         self._setup_client()
     
     @abstractmethod
@@ -39,27 +220,150 @@ class BaseProvider(ABC):
         """Generate a streaming chat completion."""
         pass
     
+    async def chat_completion_batch(
+        self,
+        batch: List[List[ChatMessage]],
+        concurrency: int = 32,
+        **kwargs: Any
+    ) -> List[Union[ChatResponse, BaseException]]:
+        """
+        Run one chat completion per conversation in batch concurrently.
+        
+        At most concurrency requests are in flight at once. Results come back
+        in input order; a failed request yields its exception in place.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def one(messages: List[ChatMessage]) -> ChatResponse:
+            async with semaphore:
+                return await self.chat_completion(messages, **kwargs)
+        
+        return await asyncio.gather(*(one(messages) for messages in batch), return_exceptions=True)
+    
+    async def aclose(self) -> None:
+        """Release any network resources held by this provider."""
+        pass
+    
+    @staticmethod
+    def _message_dicts(messages: List[ChatMessage]) -> List[Dict[str, Any]]:
+        """
+        Convert messages to OpenAI-style dicts without re-validating them.
+        
+        Optional fields are only included when set, so plain text turns stay
+        two-key dicts.
+        """
+        return list(map(_message_dict, messages))
+    
+    @asynccontextmanager
+    async def _throttled(self, messages: List[ChatMessage], kwargs: Dict[str, Any]) -> AsyncIterator[None]:
+        """Hold a concurrency slot and spend the request's estimated tokens."""
+        semaphore = self._semaphore
+        if semaphore is None and self.config.max_concurrency:
+            semaphore = self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        
+        if semaphore is not None:
+            await semaphore.acquire()
+        try:
+            if self._token_bucket is not None:
+                await self._token_bucket.acquire(self._estimate_tokens(messages, kwargs))
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+    
+    def _estimate_tokens(self, messages: List[ChatMessage], kwargs: Dict[str, Any]) -> int:
+        """Rough token count of a request: ~4 characters per prompt token plus max_tokens."""
+        prompt_chars = sum(len(msg.content) for msg in messages)
+        return prompt_chars // 4 + (kwargs.get("max_tokens", self.config.max_tokens) or 0)
+    
+    def _effective_temperature(self, kwargs: Dict[str, Any]) -> Optional[float]:
+        """Temperature a request is sent with: the request's, else the config's, else the default."""
+        if "temperature" in kwargs:
+            return kwargs["temperature"]
+        if self.config.temperature is not None:
+            return self.config.temperature
+        return self._DEFAULT_TEMPERATURE
+    
+    def _response_cache_key(self, messages: List[ChatMessage], kwargs: Dict[str, Any]) -> Optional[str]:
+        """
+        Cache key for a request, or None if its response must not be cached.
+        
+        Only non-streaming requests at temperature 0 are cached; sampled
+        completions are expected to differ between calls.
+        """
+        if self._response_cache is None or kwargs.get("stream", self.config.stream):
+            return None
+        # Judged on the temperature actually sent, so a provider default
+        # never lets sampled responses into the cache
+        if self._effective_temperature(kwargs) != 0:
+            return None
+        
+        request = {
+            "model": self.config.model_name.lower(),
+            "messages": [
+                (
+                    _ROLE_VALUES[msg.role],
+                    unicodedata.normalize("NFC", msg.content),
+                    msg.name,
+                    msg.tool_calls,
+                    msg.tool_call_id,
+                )
+                for msg in messages
+            ],
+        }
+        for option in _CACHE_KEY_OPTIONS:
+            request[option] = kwargs.get(option)
+        
+        payload = orjson.dumps(request, default=_dump_model, option=orjson.OPT_SORT_KEYS)
+        # Model-name prefix so one model's entries can be invalidated together
+        return self._cache_prefix() + hashlib.sha256(payload).hexdigest()
+    
+    async def _cached_response(self, key: str) -> Optional[ChatResponse]:
+        """Live cached response for key, with zero cost."""
+        payload = await self._response_cache.get(key)
+        if payload is None:
+            return None
+        
+        response = ChatResponse.model_validate(orjson.loads(payload))
+        if response.usage is not None:
+            self.saved_tokens += response.usage.total_tokens
+            response.usage.cost = 0.0
+        return response
+    
+    async def _store_response(self, key: str, response: ChatResponse) -> None:
+        """Cache response under key for response_cache_ttl seconds."""
+        payload = orjson.dumps(response.model_dump())
+        await self._response_cache.set(key, payload, self.config.response_cache_ttl)
+    
+    async def invalidate_cache(self) -> None:
+        """Drop this model's cached responses (from every worker, with Redis)."""
+        if self._response_cache is not None:
+            await self._response_cache.invalidate(self._cache_prefix())
+    
+    def _cache_prefix(self) -> str:
+        return self.config.model_name.lower() + ":"
+    
     def _create_usage(
         self,
         prompt_tokens: int = 0,
         completion_tokens: int = 0,
-        cost: Optional[float] = None
+        total_tokens: Optional[int] = None
     ) -> Usage:
-        """Create usage information."""
-        return Usage(
+        """Create usage information, priced at the configured model's rates."""
+        return Usage.model_construct(
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
-            total_tokens=prompt_tokens + completion_tokens,
-            cost=cost
+            total_tokens=prompt_tokens + completion_tokens if total_tokens is None else total_tokens,
+            cost=self._calculate_cost(prompt_tokens, completion_tokens, self.config.model_name)
         )
     
     def _generate_id(self) -> str:
         """Generate a unique ID for responses."""
-        return f"chatcmpl-{int(time.time() * 1000)}"
+        return _id_prefix + format(next(_id_counter), "x")
     
     def _get_current_timestamp(self) -> int:
         """Get current timestamp."""
-        return int(time.time())
+        return time.time_ns() // 1_000_000_000
     
     def _calculate_cost(
         self,
@@ -68,24 +372,45 @@ class BaseProvider(ABC):
         model: str
     ) -> Optional[float]:
         """Calculate cost based on token usage."""
-        cost_per_1k_input = self._get_input_cost_per_1k(model)
-        cost_per_1k_output = self._get_output_cost_per_1k(model)
+        cost = self._calculate_cost_nano(prompt_tokens, completion_tokens, model)
+        if cost is None:
+            return None
+        return cost / _NANO_USD
+    
+    def _calculate_cost_nano(
+        self,
+        prompt_tokens: int,
+        completion_tokens: int,
+        model: str
+    ) -> Optional[int]:
+        """Exact cost in nano-dollars (USD * 1e9) based on token usage."""
+        try:
+            prices = self._prices[model]
+        except KeyError:
+            # Streams price many chunks for the same model; look it up once
+            cost_per_1k_input = self._get_input_cost_per_1k(model)
+            cost_per_1k_output = self._get_output_cost_per_1k(model)
+            prices = None
+            if cost_per_1k_input is not None and cost_per_1k_output is not None:
+                # USD per 1K tokens -> nano-dollars per token
+                prices = (
+                    round(cost_per_1k_input * _NANO_USD / 1000),
+                    round(cost_per_1k_output * _NANO_USD / 1000),
+                )
+            self._prices[model] = prices
         
-        if cost_per_1k_input is None or cost_per_1k_output is None:
+        if prices is None:
             return None
-            
-        input_cost = (prompt_tokens / 1000) * cost_per_1k_input
-        output_cost = (completion_tokens / 1000) * cost_per_1k_output
         
-        return input_cost + output_cost
+        return prompt_tokens * prices[0] + completion_tokens * prices[1]
     
     def _get_input_cost_per_1k(self, model: str) -> Optional[float]:
         """Get input cost per 1K tokens for a model."""
-        return None
+        return self._INPUT_COSTS_PER_1K.get(model.lower())
     
     def _get_output_cost_per_1k(self, model: str) -> Optional[float]:
         """Get output cost per 1K tokens for a model."""
-        return None
+        return self._OUTPUT_COSTS_PER_1K.get(model.lower())
     
     def _setup_proxy(self) -> Optional[Dict[str, str]]:
         """Setup proxy configuration if provided."""
@@ -96,3 +421,24 @@ class BaseProvider(ABC):
             return self.config.proxy_config.to_dict()
         
         return self.config.proxy_config
+    
+    def _proxy_url(self) -> Optional[str]:
+        """Proxy URL for this provider's HTTP client, resolved once at setup."""
+        proxy_config = self._setup_proxy()
+        if not proxy_config:
+            return None
+        return proxy_config.get("http") or proxy_config.get("https")
+    
+    def _use_http2(self) -> bool:
+        """Whether to enable HTTP/2, which needs the optional h2 package."""
+        if not self.config.http2:
+            return False
+        if importlib.util.find_spec("h2") is None:
+            logger.warning("http2 requested but h2 is not installed (pip install 'httpx[http2]'); using HTTP/1.1")
+            return False
+        return True
+    
+    def _setup_http_limits(self) -> httpx.Limits:
+        """Build connection pool limits, using httpx defaults when not configured."""
+        limits = self.config.http_limits or HttpLimits()
+        return httpx.Limits(**limits.model_dump())
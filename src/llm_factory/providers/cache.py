@@ -0,0 +1,101 @@
+"""
+Response cache backends shared by providers.
+"""
+
+import functools
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from ..models import ModelConfig
+
+
+class CacheBackend(ABC):
+    """Key/value store for serialized responses."""
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return the payload stored under key, or None if missing or expired."""
+        pass
+    
+    @abstractmethod
+    async def set(self, key: str, payload: bytes, ttl: float) -> None:
+        """Store payload under key for ttl seconds."""
+        pass
+    
+    @abstractmethod
+    async def invalidate(self, prefix: str) -> None:
+        """Drop every entry whose key starts with prefix."""
+        pass
+
+
+class InMemoryLRU(CacheBackend):
+    """Per-process cache with TTL and least-recently-used eviction."""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # key -> (expiry on time.monotonic(), payload), oldest first
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        expires, payload = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return payload
+    
+    async def set(self, key: str, payload: bytes, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, payload)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    async def invalidate(self, prefix: str) -> None:
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[key]
+
+
+class RedisBackend(CacheBackend):
+    """Cache shared by every worker process that points at the same Redis."""
+    
+    def __init__(self, url: str, namespace: str = "llm-factory:"):
+        self.client = _redis_client(url)
+        self.namespace = namespace
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.namespace + key)
+    
+    async def set(self, key: str, payload: bytes, ttl: float) -> None:
+        await self.client.set(self.namespace + key, payload, px=int(ttl * 1000))
+    
+    async def invalidate(self, prefix: str) -> None:
+        keys = [key async for key in self.client.scan_iter(match=self.namespace + prefix + "*")]
+        if keys:
+            await self.client.delete(*keys)
+
+
+@functools.lru_cache(maxsize=None)
+def _redis_client(url: str) -> Any:
+    """One connection pool per Redis URL, shared by all providers."""
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        raise ImportError("Redis response cache requires the redis package. Please install it with: pip install redis")
+    
+    return redis.Redis.from_url(url)
+
+
+def build_cache(config: ModelConfig) -> Optional[CacheBackend]:
+    """Response cache for a provider config, or None if caching is off."""
+    if config.response_cache_redis_url:
+        return RedisBackend(config.response_cache_redis_url)
+    if config.response_cache_size > 0:
+        return InMemoryLRU(config.response_cache_size)
+    return None
@@ -2,44 +2,169 @@
 Claude provider implementation using AWS Bedrock.
 """
 
-import json
-from typing import Any, AsyncGenerator, Dict, List, Optional, Union
+import asyncio
+import functools
+import threading
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, Union
 
 import boto3
+import orjson
 from botocore.config import Config
 from loguru import logger
 
-from ..models import ChatMessage, ChatResponse, ModelConfig, StreamChunk, Usage
-from .base import BaseProvider
+from ..models import ChatMessage, ChatResponse, MessageRole, ModelConfig, StreamChunk, Usage
+from .base import _ROLE_VALUES, BaseProvider, cache_responses, throttle
+
+# Parsed chunks buffered between the stream reader thread and the consumer
+_STREAM_QUEUE_SIZE = 64
+
+# Pool size for Bedrock clients when the config sets no http_limits
+_DEFAULT_MAX_POOL_CONNECTIONS = 64
+
+# One session for all Bedrock clients. Sessions are not thread-safe, so client
+# creation is serialized (providers may be built from several threads).
+_session = boto3.session.Session()
+_session_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=16)
+def _get_bedrock_client(
+    region: str,
+    access_key: Optional[str],
+    secret_key: Optional[str],
+    timeout: int,
+    max_retries: int,
+    proxies: Optional[Tuple[Tuple[str, str], ...]],
+    max_pool_connections: int,
+) -> Any:
+    """Bedrock runtime client, shared by providers with identical settings."""
+    boto_config = Config(
+        connect_timeout=timeout,
+        read_timeout=timeout,
+        retries={'max_attempts': max_retries},
+        proxies=dict(proxies) if proxies else None,
+        max_pool_connections=max_pool_connections,
+    )
+    with _session_lock:
+        return _session.client(
+            service_name='bedrock-runtime',
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            config=boto_config
+        )
 
 
 class ClaudeProvider(BaseProvider):
     """Claude provider using AWS Bedrock."""
     
+    # Prices in USD per 1K tokens, keyed by lowercase model name
+    _INPUT_COSTS_PER_1K = {
+        "anthropic.claude-3-5-sonnet-20241022-v2:0": 0.003,
+        "anthropic.claude-3-5-haiku-20241022-v1:0": 0.0008,
+        "anthropic.claude-3-opus-20240229-v1:0": 0.015,
+        "us.anthropic.claude-3-7-sonnet-20250219-v1:0": 0.003,
+    }
+    _OUTPUT_COSTS_PER_1K = {
+        "anthropic.claude-3-5-sonnet-20241022-v2:0": 0.015,
+        "anthropic.claude-3-5-haiku-20241022-v1:0": 0.004,
+        "anthropic.claude-3-opus-20240229-v1:0": 0.075,
+        "us.anthropic.claude-3-7-sonnet-20250219-v1:0": 0.015,
+    }
+    _DEFAULT_TEMPERATURE = 0.1
+    
     def _setup_client(self) -> None:
         """Setup AWS Bedrock client."""
-        boto_config = Config(
-            connect_timeout=self.config.timeout,
-            read_timeout=self.config.timeout,
-            retries={'max_attempts': self.config.max_retries},
-        )
+        proxies = self.config.proxy_config
+        if proxies is not None and not isinstance(proxies, dict):
+            proxies = proxies.to_dict()
         
-        if self.config.proxy_config:
-            boto_config = Config(
-                connect_timeout=self.config.timeout,
-                read_timeout=self.config.timeout,
-                retries={'max_attempts': self.config.max_retries},
-                proxies=self.config.proxy_config
-            )
+        max_pool = _DEFAULT_MAX_POOL_CONNECTIONS
+        if self.config.http_limits and self.config.http_limits.max_connections:
+            max_pool = self.config.http_limits.max_connections
         
-        self.client = boto3.client(
-            service_name='bedrock-runtime',
-            region_name=self.config.region or 'us-east-1',
-            aws_access_key_id=self.config.api_key,
-            aws_secret_access_key=self.config.api_base,
-            config=boto_config
+        self.client = _get_bedrock_client(
+            self.config.region or 'us-east-1',
+            self.config.api_key,
+            self.config.api_base,
+            self.config.timeout,
+            self.config.max_retries,
+            tuple(sorted(proxies.items())) if proxies else None,
+            max_pool,
         )
+        
+        # Request fields that only depend on the config, built once
+        self._is_37_sonnet = "claude-3-7-sonnet" in self.config.model_name
+        self._base_body: Dict[str, Any] = {"anthropic_version": "bedrock-2023-05-31"}
+        if self._is_37_sonnet:
+            self._base_body["thinking"] = {
+                "type": "enabled",
+                "budget_tokens": 16000
+            }
+        self._default_max_tokens = self.config.max_tokens or 4096
+        self._default_temperature = self._effective_temperature({})
     
+    @staticmethod
+    def _split_messages(
+        messages: List[ChatMessage]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Split messages into Bedrock system blocks and conversation turns."""
+        system_messages = []
+        user_messages = []
+        
+        for msg in messages:
+            role = msg.role
+            if role is MessageRole.SYSTEM:
+                system_messages.append({"type": "text", "text": msg.content})
+            else:
+                user_messages.append({"role": _ROLE_VALUES[role], "content": msg.content})
+        
+        return system_messages, user_messages
+    
+    def _build_request_body(
+        self,
+        user_messages: List[Dict[str, Any]],
+        system_messages: List[Dict[str, Any]],
+        kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Build the Bedrock request body from the cached template."""
+        request_body = {
+            **self._base_body,
+            "messages": user_messages,
+            "max_tokens": kwargs.get("max_tokens", self._default_max_tokens),
+            "temperature": kwargs.get("temperature", self._default_temperature),
+        }
+        
+        if system_messages:
+            request_body["system"] = system_messages
+        
+        if self._is_37_sonnet:
+            # Extended thinking needs room beyond the thinking budget
+            request_body["max_tokens"] = 24000
+        
+        return request_body
+    
+    def _request_bytes(self, messages: List[ChatMessage], kwargs: Dict[str, Any]) -> bytes:
+        """
+        Serialized request body for messages.
+        
+        The model id is not part of the body, so Claude providers with the same
+        body settings send identical bytes. When the factory passes a per-request
+        body_cache, failover between them serializes the request only once.
+        """
+        cache = kwargs.get("body_cache")
+        key = (ClaudeProvider, self._is_37_sonnet, self._default_max_tokens, self._default_temperature)
+        if cache is not None and key in cache:
+            return cache[key]
+        
+        system_messages, user_messages = self._split_messages(messages)
+        body = orjson.dumps(self._build_request_body(user_messages, system_messages, kwargs))
+        if cache is not None:
+            cache[key] = body
+        return body
+    
+    @cache_responses
+    @throttle
     async def chat_completion(
         self,
         messages: List[ChatMessage],
@@ -50,46 +175,13 @@ class ClaudeProvider(BaseProvider):
             return self.chat_completion_stream(messages, **kwargs)
         
         try:
-            system_messages = []
-            user_messages = []
-            
-            for msg in messages:
-                if msg.role.value == "system":
-                    system_messages.append({
-                        "type": "text",
-                        "text": msg.content
-                    })
-                else:
-                    user_messages.append({
-                        "role": msg.role.value,
-                        "content": msg.content
-                    })
-            
-            request_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "messages": user_messages,
-                "max_tokens": kwargs.get("max_tokens", self.config.max_tokens or 4096),
-                "temperature": kwargs.get("temperature", self.config.temperature or 0.1),
-            }
-            
-            if system_messages:
-                request_body["system"] = system_messages
+            body = self._request_bytes(messages, kwargs)
             
-            if "claude-3-7-sonnet" in self.config.model_name:
-                request_body["thinking"] = {
-                    "type": "enabled",
-                    "budget_tokens": 16000
-                }
-                request_body["max_tokens"] = 24000
+            # boto3 is blocking; keep the event loop free during the round trip
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, self._invoke_model, body)
             
-            response = self.client.invoke_model(
-                modelId=self.config.model_name,
-                body=json.dumps(request_body)
-            )
-            
-            result = json.loads(response['body'].read())
-            
-            usage = Usage(
+            usage = Usage.model_construct(
                 prompt_tokens=result.get("usage", {}).get("input_tokens", 0),
                 completion_tokens=result.get("usage", {}).get("output_tokens", 0),
                 total_tokens=result.get("usage", {}).get("input_tokens", 0) + result.get("usage", {}).get("output_tokens", 0),
@@ -109,7 +201,7 @@ class ClaudeProvider(BaseProvider):
                 "finish_reason": result.get("stop_reason", "stop")
             }]
             
-            return ChatResponse(
+            return ChatResponse.model_construct(
                 id=self._generate_id(),
                 created=self._get_current_timestamp(),
                 model=self.config.model_name,
@@ -118,9 +210,10 @@ class ClaudeProvider(BaseProvider):
             )
             
         except Exception as e:
-            logger.error(f"Claude completion error: {e}")
+            logger.error("Claude completion error: {}", e)
             raise
     
+    @throttle
     async def chat_completion_stream(
         self,
         messages: List[ChatMessage],
@@ -128,110 +221,137 @@ class ClaudeProvider(BaseProvider):
     ) -> AsyncGenerator[StreamChunk, None]:
         """Generate a streaming chat completion."""
         try:
-            system_messages = []
-            user_messages = []
-            
-            for msg in messages:
-                if msg.role.value == "system":
-                    system_messages.append({
-                        "type": "text",
-                        "text": msg.content
-                    })
-                else:
-                    user_messages.append({
-                        "role": msg.role.value,
-                        "content": msg.content
-                    })
-            
-            request_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "messages": user_messages,
-                "max_tokens": kwargs.get("max_tokens", self.config.max_tokens or 4096),
-                "temperature": kwargs.get("temperature", self.config.temperature or 0.1),
-            }
-            
-            if system_messages:
-                request_body["system"] = system_messages
+            body = self._request_bytes(messages, kwargs)
             
-            if "claude-3-7-sonnet" in self.config.model_name:
-                request_body["thinking"] = {
-                    "type": "enabled",
-                    "budget_tokens": 16000
-                }
-                request_body["max_tokens"] = 24000
-            
-            response = self.client.invoke_model_with_response_stream(
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(None, functools.partial(
+                self.client.invoke_model_with_response_stream,
                 modelId=self.config.model_name,
-                body=json.dumps(request_body)
-            )
+                body=body
+            ))
             
             stream = response.get('body')
             if stream:
-                for event in stream:
-                    chunk = event.get("chunk")
-                    if chunk:
-                        chunk_json = json.loads(chunk.get("bytes").decode())
-                        
-                        usage = None
-                        if chunk_json.get("usage"):
-                            usage_info = chunk_json["usage"]
-                            usage = Usage(
-                                prompt_tokens=usage_info.get("input_tokens", 0),
-                                completion_tokens=usage_info.get("output_tokens", 0),
-                                total_tokens=usage_info.get("input_tokens", 0) + usage_info.get("output_tokens", 0),
-                                cost=self._calculate_cost(
-                                    usage_info.get("input_tokens", 0),
-                                    usage_info.get("output_tokens", 0),
-                                    self.config.model_name
-                                )
-                            )
-                        
-                        choices = []
-                        if chunk_json.get("type") == "content_block_delta":
-                            choices = [{
-                                "index": 0,
-                                "delta": {
-                                    "role": "assistant",
-                                    "content": chunk_json.get("delta", {}).get("text", "")
-                                },
-                                "finish_reason": None
-                            }]
-                        elif chunk_json.get("type") == "message_stop":
-                            choices = [{
-                                "index": 0,
-                                "delta": {},
-                                "finish_reason": "stop"
-                            }]
-                        
-                        if choices:
-                            yield StreamChunk(
-                                id=self._generate_id(),
-                                created=self._get_current_timestamp(),
-                                model=self.config.model_name,
-                                choices=choices,
-                                usage=usage
-                            )
-                            
+                # A worker thread reads and parses the blocking event stream into
+                # a bounded queue; a full queue pauses it until we catch up
+                queue: asyncio.Queue = asyncio.Queue(maxsize=_STREAM_QUEUE_SIZE)
+                stop = threading.Event()
+                # Every chunk of a stream shares one id and timestamp
+                stream_id = self._generate_id()
+                created = self._get_current_timestamp()
+                producer = threading.Thread(
+                    target=self._produce_chunks,
+                    args=(stream, queue, loop, stop, stream_id, created),
+                    daemon=True
+                )
+                producer.start()
+                try:
+                    while (item := await queue.get()) is not None:
+                        if isinstance(item, BaseException):
+                            raise item
+                        yield item
+                finally:
+                    stop.set()
+                    # Unblock a producer waiting on a full queue so it can exit
+                    while not queue.empty():
+                        queue.get_nowait()
+            
         except Exception as e:
-            logger.error(f"Claude streaming error: {e}")
+            logger.error("Claude streaming error: {}", e)
             raise
     
-    def _get_input_cost_per_1k(self, model: str) -> Optional[float]:
-        """Get input cost per 1K tokens for Claude models."""
-        costs = {
-            "anthropic.claude-3-5-sonnet-20241022-v2:0": 0.003,
-            "anthropic.claude-3-5-haiku-20241022-v1:0": 0.0008,
-            "anthropic.claude-3-opus-20240229-v1:0": 0.015,
-            "us.anthropic.claude-3-7-sonnet-20250219-v1:0": 0.003,
-        }
-        return costs.get(model.lower())
+    def _produce_chunks(
+        self,
+        stream: Any,
+        queue: asyncio.Queue,
+        loop: asyncio.AbstractEventLoop,
+        stop: threading.Event,
+        stream_id: str,
+        created: int
+    ) -> None:
+        """Feed parsed chunks from a Bedrock event stream into queue (runs in a thread)."""
+        def put(item: Any) -> None:
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+        
+        try:
+            for event in stream:
+                if stop.is_set():
+                    break
+                chunk = self._event_to_chunk(event, stream_id, created)
+                if chunk is not None:
+                    put(chunk)
+            else:
+                put(None)
+        except Exception as e:
+            if not stop.is_set():
+                put(e)
+        finally:
+            if stop.is_set():
+                # Release the HTTP connection of an abandoned stream
+                close = getattr(stream, "close", None)
+                if close:
+                    close()
     
-    def _get_output_cost_per_1k(self, model: str) -> Optional[float]:
-        """Get output cost per 1K tokens for Claude models."""
-        costs = {
-            "anthropic.claude-3-5-sonnet-20241022-v2:0": 0.015,
-            "anthropic.claude-3-5-haiku-20241022-v1:0": 0.004,
-            "anthropic.claude-3-opus-20240229-v1:0": 0.075,
-            "us.anthropic.claude-3-7-sonnet-20250219-v1:0": 0.015,
-        }
-        return costs.get(model.lower())
+    def _event_to_chunk(self, event: Dict[str, Any], stream_id: str, created: int) -> Optional[StreamChunk]:
+        """Convert one Bedrock stream event into a StreamChunk, if it carries one."""
+        chunk = event.get("chunk")
+        if not chunk:
+            return None
+        
+        chunk_json = orjson.loads(chunk.get("bytes"))
+        chunk_type = chunk_json.get("type")
+        
+        usage = None
+        if chunk_type == "content_block_delta":
+            choices = [{
+                "index": 0,
+                "delta": {
+                    "role": "assistant",
+                    "content": chunk_json.get("delta", {}).get("text", "")
+                },
+                "finish_reason": None
+            }]
+        elif chunk_type == "message_stop":
+            choices = [{
+                "index": 0,
+                "delta": {},
+                "finish_reason": "stop"
+            }]
+            # Token counts for the whole stream arrive once, on the final event
+            usage = self._stream_usage(chunk_json)
+        else:
+            return None
+        
+        # Fields are built here and already typed, so skip validation per chunk
+        return StreamChunk.model_construct(
+            id=stream_id,
+            created=created,
+            model=self.config.model_name,
+            choices=choices,
+            usage=usage
+        )
+    
+    def _stream_usage(self, chunk_json: Dict[str, Any]) -> Optional[Usage]:
+        """Usage for a finished stream from its message_stop event."""
+        metrics = chunk_json.get("amazon-bedrock-invocationMetrics")
+        if metrics:
+            input_tokens = metrics.get("inputTokenCount", 0)
+            output_tokens = metrics.get("outputTokenCount", 0)
+        else:
+            usage_info = chunk_json.get("usage")
+            if not usage_info:
+                return None
+            input_tokens = usage_info.get("input_tokens", 0)
+            output_tokens = usage_info.get("output_tokens", 0)
+        
+        return Usage.model_construct(
+            prompt_tokens=input_tokens,
+            completion_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+            cost=self._calculate_cost(input_tokens, output_tokens, self.config.model_name)
+        )
+    
+    def _invoke_model(self, body: bytes) -> Dict[str, Any]:
+        """Invoke the model and read the whole response body (blocking)."""
+        response = self.client.invoke_model(modelId=self.config.model_name, body=body)
+        return orjson.loads(response['body'].read())
@@ -2,18 +2,35 @@
 DeepSeek provider implementation.
 """
 
-import json
-from typing import Any, AsyncGenerator, Dict, List, Optional, Union
+from typing import Any, AsyncGenerator, Dict, List, Union
 
 import httpx
+import orjson
 from loguru import logger
 
-from ..models import ChatMessage, ChatResponse, ModelConfig, StreamChunk, Usage
-from .base import BaseProvider
+from ..models import ChatMessage, ChatResponse, ModelConfig, StreamChunk
+from .base import BaseProvider, cache_responses, iter_sse_data, throttle
 
 
 class DeepSeekProvider(BaseProvider):
     """DeepSeek provider implementation."""
+    
+    # Prices in USD per 1K tokens, keyed by lowercase model name
+    _INPUT_COSTS_PER_1K = {
+        "deepseek-chat": 0.00014,
+        "deepseek-coder": 0.00014,
+        "deepseek-r1": 0.00055,
+        "deepseek-r1-distill-qwen-32b": 0.00027,
+        "deepseek-r1-distill-llama-8b": 0.00014,
+    }
+    _OUTPUT_COSTS_PER_1K = {
+        "deepseek-chat": 0.00028,
+        "deepseek-coder": 0.00028,
+        "deepseek-r1": 0.0022,
+        "deepseek-r1-distill-qwen-32b": 0.0011,
+        "deepseek-r1-distill-llama-8b": 0.00028,
+    }
+    _DEFAULT_TEMPERATURE = 1.0
 
     def _setup_client(self) -> None:
         """Setup DeepSeek client."""
@@ -22,7 +39,26 @@ class DeepSeekProvider(BaseProvider):
             "Authorization": f"Bearer {self.config.api_key}",
             "Content-Type": "application/json",
         }
+        self._completions_url = f"{self.base_url}/chat/completions"
+        
+        proxy_url = self._proxy_url()
+        
+        # One pooled client per provider keeps connections alive between calls;
+        # with http2 concurrent requests also share a multiplexed connection
+        self.client = httpx.AsyncClient(
+            http2=self._use_http2(),
+            proxy=proxy_url,
+            timeout=httpx.Timeout(self.config.timeout),
+            limits=self._setup_http_limits(),
+            headers=self.headers,
+        )
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        await self.client.aclose()
 
+    @cache_responses
+    @throttle
     async def chat_completion(
         self,
         messages: List[ChatMessage],
@@ -30,19 +66,10 @@ class DeepSeekProvider(BaseProvider):
     ) -> Union[ChatResponse, AsyncGenerator[StreamChunk, None]]:
         """Generate a chat completion."""
         if kwargs.get("stream", self.config.stream):
-            return self._chat_completion_stream_wrapper(messages, **kwargs)
+            return self.chat_completion_stream(messages, **kwargs)
         
         return await self._chat_completion_non_stream(messages, **kwargs)
     
-    async def _chat_completion_stream_wrapper(
-        self,
-        messages: List[ChatMessage],
-        **kwargs: Any
-    ) -> AsyncGenerator[StreamChunk, None]:
-        """Wrapper for streaming chat completion."""
-        async for chunk in self.chat_completion_stream(messages, **kwargs):
-            yield chunk
-    
     async def _chat_completion_non_stream(
         self,
         messages: List[ChatMessage],
@@ -50,15 +77,12 @@ class DeepSeekProvider(BaseProvider):
     ) -> ChatResponse:
         """Generate a non-streaming chat completion."""
         try:
-            deepseek_messages = [
-                {"role": msg.role.value, "content": msg.content}
-                for msg in messages
-            ]
+            deepseek_messages = self._message_dicts(messages)
 
             payload = {
                 "model": self.config.model_name,
                 "messages": deepseek_messages,
-                "temperature": kwargs.get("temperature", self.config.temperature or 1.0),
+                "temperature": self._effective_temperature(kwargs),
                 "max_tokens": kwargs.get("max_tokens", self.config.max_tokens),
                 "top_p": kwargs.get("top_p", self.config.top_p or 1.0),
                 "stream": False,
@@ -71,37 +95,21 @@ class DeepSeekProvider(BaseProvider):
             if kwargs.get("response_format"):
                 payload["response_format"] = kwargs["response_format"]
 
-            proxy_config = self._setup_proxy()
-            timeout = httpx.Timeout(self.config.timeout)
-
-            proxy_url = None
-            if proxy_config:
-                proxy_url = proxy_config.get("http") or proxy_config.get("https")
-            
-            async with httpx.AsyncClient(proxy=proxy_url, timeout=timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=self.headers,
-                    json=payload
-                )
-                response.raise_for_status()
-                result = response.json()
+            # The client already sends Content-Type: application/json
+            response = await self.client.post(self._completions_url, content=orjson.dumps(payload))
+            response.raise_for_status()
+            result = orjson.loads(response.content)
 
             usage_info = result.get("usage", {})
-            usage = Usage(
-                prompt_tokens=usage_info.get("prompt_tokens", 0),
-                completion_tokens=usage_info.get("completion_tokens", 0),
-                total_tokens=usage_info.get("total_tokens", 0),
-                cost=self._calculate_cost(
-                    usage_info.get("prompt_tokens", 0),
-                    usage_info.get("completion_tokens", 0),
-                    self.config.model_name
-                )
+            usage = self._create_usage(
+                usage_info.get("prompt_tokens", 0),
+                usage_info.get("completion_tokens", 0),
+                usage_info.get("total_tokens")
             )
 
-            return ChatResponse(
-                id=result.get("id", self._generate_id()),
-                created=result.get("created", self._get_current_timestamp()),
+            return ChatResponse.model_construct(
+                id=result.get("id") or self._generate_id(),
+                created=result.get("created") or self._get_current_timestamp(),
                 model=result.get("model", self.config.model_name),
                 choices=result.get("choices", []),
                 usage=usage,
@@ -109,9 +117,10 @@ class DeepSeekProvider(BaseProvider):
             )
 
         except Exception as e:
-            logger.error(f"DeepSeek completion error: {e}")
+            logger.error("DeepSeek completion error: {}", e)
             raise
 
+    @throttle
     async def chat_completion_stream(
         self,
         messages: List[ChatMessage],
@@ -119,15 +128,12 @@ class DeepSeekProvider(BaseProvider):
     ) -> AsyncGenerator[StreamChunk, None]:
         """Generate a streaming chat completion."""
         try:
-            deepseek_messages = [
-                {"role": msg.role.value, "content": msg.content}
-                for msg in messages
-            ]
+            deepseek_messages = self._message_dicts(messages)
 
             payload = {
                 "model": self.config.model_name,
                 "messages": deepseek_messages,
-                "temperature": kwargs.get("temperature", self.config.temperature or 1.0),
+                "temperature": self._effective_temperature(kwargs),
                 "max_tokens": kwargs.get("max_tokens", self.config.max_tokens),
                 "top_p": kwargs.get("top_p", self.config.top_p or 1.0),
                 "stream": True,
@@ -140,78 +146,42 @@ class DeepSeekProvider(BaseProvider):
             if kwargs.get("response_format"):
                 payload["response_format"] = kwargs["response_format"]
 
-            proxy_config = self._setup_proxy()
-            timeout = httpx.Timeout(self.config.timeout)
-
-            proxy_url = None
-            if proxy_config:
-                proxy_url = proxy_config.get("http") or proxy_config.get("https")
-            
-            async with httpx.AsyncClient(proxy=proxy_url, timeout=timeout) as client:
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/chat/completions",
-                    headers=self.headers,
-                    json=payload
-                ) as response:
-                    response.raise_for_status()
-
-                    async for line in response.aiter_lines():
-                        if line.startswith("data: "):
-                            data = line[6:]
-                            if data == "[DONE]":
-                                break
-
-                            try:
-                                chunk_data = json.loads(data)
-                                usage_info = chunk_data.get("usage", {})
-
-                                usage = None
-                                if usage_info:
-                                    usage = Usage(
-                                        prompt_tokens=usage_info.get("prompt_tokens", 0),
-                                        completion_tokens=usage_info.get("completion_tokens", 0),
-                                        total_tokens=usage_info.get("total_tokens", 0),
-                                        cost=self._calculate_cost(
-                                            usage_info.get("prompt_tokens", 0),
-                                            usage_info.get("completion_tokens", 0),
-                                            self.config.model_name
-                                        )
-                                    )
-
-                                yield StreamChunk(
-                                    id=chunk_data.get("id", self._generate_id()),
-                                    created=chunk_data.get("created", self._get_current_timestamp()),
-                                    model=chunk_data.get("model", self.config.model_name),
-                                    choices=chunk_data.get("choices", []),
-                                    usage=usage
-                                )
-
-                            except json.JSONDecodeError:
-                                continue
+            async with self.client.stream("POST", self._completions_url, content=orjson.dumps(payload)) as response:
+                response.raise_for_status()
+
+                # Callers that ignore token accounting can skip pricing it
+                return_usage = kwargs.get("return_usage", True)
+                # Fallbacks for chunks without them: one id and timestamp per stream
+                stream_id = self._generate_id()
+                created = self._get_current_timestamp()
+                
+                async for data in iter_sse_data(response):
+                    if data == b"[DONE]":
+                        break
+
+                    try:
+                        chunk_data = orjson.loads(data)
+                        usage_info = chunk_data.get("usage")
+
+                        usage = None
+                        if usage_info and return_usage:
+                            usage = self._create_usage(
+                                usage_info.get("prompt_tokens", 0),
+                                usage_info.get("completion_tokens", 0),
+                                usage_info.get("total_tokens")
+                            )
+
+                        yield StreamChunk.model_construct(
+                            id=chunk_data.get("id") or stream_id,
+                            created=chunk_data.get("created") or created,
+                            model=chunk_data.get("model", self.config.model_name),
+                            choices=chunk_data.get("choices", []),
+                            usage=usage
+                        )
+
+                    except orjson.JSONDecodeError:
+                        continue
 
         except Exception as e:
-            logger.error(f"DeepSeek streaming error: {e}")
+            logger.error("DeepSeek streaming error: {}", e)
             raise
-
-    def _get_input_cost_per_1k(self, model: str) -> Optional[float]:
-        """Get input cost per 1K tokens for DeepSeek models."""
-        costs = {
-            "deepseek-chat": 0.00014,
-            "deepseek-coder": 0.00014,
-            "deepseek-r1": 0.00055,
-            "deepseek-r1-distill-qwen-32b": 0.00027,
-            "deepseek-r1-distill-llama-8b": 0.00014,
-        }
-        return costs.get(model.lower())
-
-    def _get_output_cost_per_1k(self, model: str) -> Optional[float]:
-        """Get output cost per 1K tokens for DeepSeek models."""
-        costs = {
-            "deepseek-chat": 0.00028,
-            "deepseek-coder": 0.00028,
-            "deepseek-r1": 0.0022,
-            "deepseek-r1-distill-qwen-32b": 0.0011,
-            "deepseek-r1-distill-llama-8b": 0.00028,
-        }
-        return costs.get(model.lower())
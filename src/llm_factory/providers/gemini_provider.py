@@ -2,14 +2,15 @@
 Gemini provider implementation.
 """
 
+import functools
 import json
 import os
-from typing import Any, AsyncGenerator, Dict, List, Optional, Union
+from typing import Any, AsyncGenerator, Dict, List, Union
 
 from loguru import logger
 
-from ..models import ChatMessage, ChatResponse, ModelConfig, StreamChunk, Usage
-from .base import BaseProvider
+from ..models import ChatMessage, ChatResponse, MessageRole, ModelConfig, StreamChunk, Usage
+from .base import BaseProvider, cache_responses, throttle
 
 try:
     from google import genai
@@ -22,9 +23,39 @@ except ImportError:
     types = None
 
 
+# "User: ", "Assistant: ", ... prefixes for the flattened prompt
+_ROLE_PREFIXES = {role: f"{role.value.title()}: " for role in MessageRole}
+
+
+@functools.lru_cache(maxsize=1)
+def _safety_settings() -> List[Any]:
+    """Safety settings sent with every request (all categories off)."""
+    return [
+        types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
+        types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
+        types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
+        types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
+    ]
+
+
 class GeminiProvider(BaseProvider):
     """Gemini provider implementation."""
     
+    # Prices in USD per 1K tokens, keyed by lowercase model name
+    _INPUT_COSTS_PER_1K = {
+        "gemini-2.0-flash-exp": 0.000075,
+        "gemini-1.5-pro": 0.00125,
+        "gemini-1.5-flash": 0.000075,
+        "gemini-1.0-pro": 0.0005,
+    }
+    _OUTPUT_COSTS_PER_1K = {
+        "gemini-2.0-flash-exp": 0.0003,
+        "gemini-1.5-pro": 0.005,
+        "gemini-1.5-flash": 0.0003,
+        "gemini-1.0-pro": 0.0015,
+    }
+    _DEFAULT_TEMPERATURE = 1.0
+    
     def _setup_client(self) -> None:
         """Setup Gemini client."""
         if not GEMINI_AVAILABLE:
@@ -40,7 +71,52 @@ class GeminiProvider(BaseProvider):
             )
         else:
             self.client = genai.Client(api_key=self.config.api_key)
+        
+        # Generation settings that do not depend on the request, built once
+        self._base_config_kwargs = {
+            "temperature": self._effective_temperature({}),
+            "top_p": self.config.top_p or 1.0,
+            "max_output_tokens": self.config.max_tokens or 8192,
+            "safety_settings": _safety_settings(),
+        }
+    
+    def _build_contents(self, messages: List[ChatMessage]) -> List[Any]:
+        """Flatten the conversation into a single Gemini user turn."""
+        system_parts = []
+        parts = []
+        for msg in messages:
+            if msg.role is MessageRole.SYSTEM:
+                system_parts.append(f"System: {msg.content}\n")
+            else:
+                parts.append(f"{_ROLE_PREFIXES[msg.role]}{msg.content}\n")
+        
+        # Each system message used to be prepended, so they come out last-first
+        system_parts.reverse()
+        content = "".join(system_parts) + "".join(parts)
+        
+        return [
+            types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=content)]
+            )
+        ]
     
+    def _build_generate_config(self, kwargs: Dict[str, Any]) -> Any:
+        """GenerateContentConfig for a request, overriding only per-request fields."""
+        config_kwargs = dict(self._base_config_kwargs)
+        if "temperature" in kwargs:
+            config_kwargs["temperature"] = kwargs["temperature"]
+        if "top_p" in kwargs:
+            config_kwargs["top_p"] = kwargs["top_p"]
+        if "max_tokens" in kwargs:
+            config_kwargs["max_output_tokens"] = kwargs["max_tokens"]
+        if kwargs.get("response_format") and kwargs["response_format"].get("type") == "json_object":
+            config_kwargs["response_mime_type"] = "application/json"
+        
+        return types.GenerateContentConfig(**config_kwargs)
+    
+    @cache_responses
+    @throttle
     async def chat_completion(
         self,
         messages: List[ChatMessage],
@@ -51,42 +127,17 @@ class GeminiProvider(BaseProvider):
             return self.chat_completion_stream(messages, **kwargs)
         
         try:
-            content = ""
-            for msg in messages:
-                if msg.role.value == "system":
-                    content = f"System: {msg.content}\n" + content
-                else:
-                    content += f"{msg.role.value.title()}: {msg.content}\n"
-            
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[types.Part.from_text(text=content)]
-                )
-            ]
-            
-            generate_config = types.GenerateContentConfig(
-                temperature=kwargs.get("temperature", self.config.temperature or 1.0),
-                top_p=kwargs.get("top_p", self.config.top_p or 1.0),
-                max_output_tokens=kwargs.get("max_tokens", self.config.max_tokens or 8192),
-                safety_settings=[
-                    types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-                    types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
-                    types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
-                    types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
-                ],
-            )
-            
-            if kwargs.get("response_format") and kwargs["response_format"].get("type") == "json_object":
-                generate_config.response_mime_type = "application/json"
+            contents = self._build_contents(messages)
+            generate_config = self._build_generate_config(kwargs)
             
-            response = self.client.models.generate_content(
+            # The aio surface keeps the event loop free while Gemini responds
+            response = await self.client.aio.models.generate_content(
                 model=self.config.model_name,
                 contents=contents,
                 config=generate_config,
             )
             
-            usage = Usage(
+            usage = Usage.model_construct(
                 prompt_tokens=response.usage_metadata.prompt_token_count if response.usage_metadata else 0,
                 completion_tokens=response.usage_metadata.candidates_token_count if response.usage_metadata else 0,
                 total_tokens=response.usage_metadata.total_token_count if response.usage_metadata else 0,
@@ -106,7 +157,7 @@ class GeminiProvider(BaseProvider):
                 "finish_reason": "stop"
             }]
             
-            return ChatResponse(
+            return ChatResponse.model_construct(
                 id=self._generate_id(),
                 created=self._get_current_timestamp(),
                 model=self.config.model_name,
@@ -115,9 +166,10 @@ class GeminiProvider(BaseProvider):
             )
             
         except Exception as e:
-            logger.error(f"Gemini completion error: {e}")
+            logger.error("Gemini completion error: {}", e)
             raise
     
+    @throttle
     async def chat_completion_stream(
         self,
         messages: List[ChatMessage],
@@ -125,42 +177,26 @@ class GeminiProvider(BaseProvider):
     ) -> AsyncGenerator[StreamChunk, None]:
         """Generate a streaming chat completion."""
         try:
-            content = ""
-            for msg in messages:
-                if msg.role.value == "system":
-                    content = f"System: {msg.content}\n" + content
-                else:
-                    content += f"{msg.role.value.title()}: {msg.content}\n"
+            contents = self._build_contents(messages)
+            generate_config = self._build_generate_config(kwargs)
             
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[types.Part.from_text(text=content)]
-                )
-            ]
-            
-            generate_config = types.GenerateContentConfig(
-                temperature=kwargs.get("temperature", self.config.temperature or 1.0),
-                top_p=kwargs.get("top_p", self.config.top_p or 1.0),
-                max_output_tokens=kwargs.get("max_tokens", self.config.max_tokens or 8192),
-                safety_settings=[
-                    types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-                    types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
-                    types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
-                    types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
-                ],
-            )
-            
-            if kwargs.get("response_format") and kwargs["response_format"].get("type") == "json_object":
-                generate_config.response_mime_type = "application/json"
-            
-            stream = self.client.models.generate_content_stream(
+            stream = await self.client.aio.models.generate_content_stream(
                 model=self.config.model_name,
                 contents=contents,
                 config=generate_config,
             )
             
-            for chunk in stream:
+            # usage_metadata is cumulative, so only the last one is priced, on
+            # the terminal chunk; return_usage=False skips it altogether
+            return_usage = kwargs.get("return_usage", True)
+            usage_metadata = None
+            # Every chunk of a stream shares one id and timestamp
+            stream_id = self._generate_id()
+            created = self._get_current_timestamp()
+            
+            async for chunk in stream:
+                if return_usage and chunk.usage_metadata:
+                    usage_metadata = chunk.usage_metadata
                 if chunk.text:
                     choices = [{
                         "index": 0,
@@ -171,59 +207,39 @@ class GeminiProvider(BaseProvider):
                         "finish_reason": None
                     }]
                     
-                    usage = None
-                    if chunk.usage_metadata:
-                        usage = Usage(
-                            prompt_tokens=chunk.usage_metadata.prompt_token_count,
-                            completion_tokens=chunk.usage_metadata.candidates_token_count,
-                            total_tokens=chunk.usage_metadata.total_token_count,
-                            cost=self._calculate_cost(
-                                chunk.usage_metadata.prompt_token_count,
-                                chunk.usage_metadata.candidates_token_count,
-                                self.config.model_name
-                            )
-                        )
-                    
-                    yield StreamChunk(
-                        id=self._generate_id(),
-                        created=self._get_current_timestamp(),
+                    yield StreamChunk.model_construct(
+                        id=stream_id,
+                        created=created,
                         model=self.config.model_name,
                         choices=choices,
-                        usage=usage
+                        usage=None
                     )
             
-            yield StreamChunk(
-                id=self._generate_id(),
-                created=self._get_current_timestamp(),
+            usage = None
+            if usage_metadata is not None:
+                usage = Usage.model_construct(
+                    prompt_tokens=usage_metadata.prompt_token_count,
+                    completion_tokens=usage_metadata.candidates_token_count,
+                    total_tokens=usage_metadata.total_token_count,
+                    cost=self._calculate_cost(
+                        usage_metadata.prompt_token_count,
+                        usage_metadata.candidates_token_count,
+                        self.config.model_name
+                    )
+                )
+            
+            yield StreamChunk.model_construct(
+                id=stream_id,
+                created=created,
                 model=self.config.model_name,
                 choices=[{
                     "index": 0,
                     "delta": {},
                     "finish_reason": "stop"
                 }],
-                usage=None
+                usage=usage
             )
                             
         except Exception as e:
-            logger.error(f"Gemini streaming error: {e}")
+            logger.error("Gemini streaming error: {}", e)
             raise
-    
-    def _get_input_cost_per_1k(self, model: str) -> Optional[float]:
-        """Get input cost per 1K tokens for Gemini models."""
-        costs = {
-            "gemini-2.0-flash-exp": 0.000075,
-            "gemini-1.5-pro": 0.00125,
-            "gemini-1.5-flash": 0.000075,
-            "gemini-1.0-pro": 0.0005,
-        }
-        return costs.get(model.lower())
-    
-    def _get_output_cost_per_1k(self, model: str) -> Optional[float]:
-        """Get output cost per 1K tokens for Gemini models."""
-        costs = {
-            "gemini-2.0-flash-exp": 0.0003,
-            "gemini-1.5-pro": 0.005,
-            "gemini-1.5-flash": 0.0003,
-            "gemini-1.0-pro": 0.0015,
-        }
-        return costs.get(model.lower())
@@ -3,19 +3,46 @@ OpenAI provider implementation using Azure OpenAI.
 """
 
 import json
-from typing import Any, AsyncGenerator, Dict, List, Optional, Union
+from typing import Any, AsyncGenerator, Dict, List, Union
 
 import httpx
 from openai import AsyncAzureOpenAI
 from loguru import logger
 
 from ..models import ChatMessage, ChatResponse, ModelConfig, StreamChunk, Usage
-from .base import BaseProvider
+from .base import BaseProvider, cache_responses, throttle
+
+# Fields _stream_choice copies by hand
+_READ_CHOICE_FIELDS = frozenset({"index", "delta", "finish_reason"})
+_READ_DELTA_FIELDS = frozenset({"role", "content", "tool_calls"})
+
+
+def _has_unread_fields(model: Any, read: frozenset) -> bool:
+    """Whether model has a non-None field, declared or extra, outside read."""
+    if model.model_extra:
+        return True
+    return any(getattr(model, name, None) is not None for name in model.model_fields_set - read)
 
 
 class OpenAIProvider(BaseProvider):
     """OpenAI provider using Azure OpenAI."""
     
+    # Prices in USD per 1K tokens, keyed by lowercase model name
+    _INPUT_COSTS_PER_1K = {
+        "gpt-4o": 0.005,
+        "gpt-4o-mini": 0.00015,
+        "gpt-4": 0.03,
+        "gpt-4-32k": 0.06,
+        "gpt-3.5-turbo": 0.0015,
+    }
+    _OUTPUT_COSTS_PER_1K = {
+        "gpt-4o": 0.015,
+        "gpt-4o-mini": 0.0006,
+        "gpt-4": 0.06,
+        "gpt-4-32k": 0.12,
+        "gpt-3.5-turbo": 0.002,
+    }
+    
     def _setup_client(self) -> None:
         """Setup Azure OpenAI client."""
         client_kwargs = {
@@ -29,16 +56,21 @@ class OpenAIProvider(BaseProvider):
         if self.config.max_retries:
             client_kwargs["max_retries"] = self.config.max_retries
         
-        proxy_dict = self._setup_proxy()
-        if proxy_dict:
-            proxy_url = proxy_dict.get("http") or proxy_dict.get("https")
-            if proxy_url:
-                client_kwargs["http_client"] = httpx.AsyncClient(
-                    proxy=proxy_url
-                )
+        proxy_url = self._proxy_url()
+        if proxy_url or self.config.http_limits:
+            client_kwargs["http_client"] = httpx.AsyncClient(
+                proxy=proxy_url,
+                limits=self._setup_http_limits(),
+            )
         
         self.client = AsyncAzureOpenAI(**client_kwargs)
     
+    async def aclose(self) -> None:
+        """Close the underlying Azure OpenAI client."""
+        await self.client.close()
+    
+    @cache_responses
+    @throttle
     async def chat_completion(
         self,
         messages: List[ChatMessage],
@@ -46,19 +78,10 @@ class OpenAIProvider(BaseProvider):
     ) -> Union[ChatResponse, AsyncGenerator[StreamChunk, None]]:
         """Generate a chat completion."""
         if kwargs.get("stream", self.config.stream):
-            return self._chat_completion_stream_wrapper(messages, **kwargs)
+            return self.chat_completion_stream(messages, **kwargs)
         
         return await self._chat_completion_non_stream(messages, **kwargs)
     
-    async def _chat_completion_stream_wrapper(
-        self,
-        messages: List[ChatMessage],
-        **kwargs: Any
-    ) -> AsyncGenerator[StreamChunk, None]:
-        """Wrapper for streaming chat completion."""
-        async for chunk in self.chat_completion_stream(messages, **kwargs):
-            yield chunk
-    
     async def _chat_completion_non_stream(
         self,
         messages: List[ChatMessage],
@@ -66,10 +89,7 @@ class OpenAIProvider(BaseProvider):
     ) -> ChatResponse:
         """Generate a non-streaming chat completion."""
         try:
-            openai_messages = [
-                {"role": msg.role.value, "content": msg.content}
-                for msg in messages
-            ]
+            openai_messages = self._message_dicts(messages)
             
             completion_kwargs = {
                 "model": self.config.model_name,
@@ -96,14 +116,14 @@ class OpenAIProvider(BaseProvider):
                     response.usage.completion_tokens,
                     self.config.model_name
                 )
-                usage = Usage(
+                usage = Usage.model_construct(
                     prompt_tokens=response.usage.prompt_tokens,
                     completion_tokens=response.usage.completion_tokens,
                     total_tokens=response.usage.total_tokens,
                     cost=cost
                 )
             
-            return ChatResponse(
+            return ChatResponse.model_construct(
                 id=response.id,
                 created=response.created,
                 model=response.model,
@@ -113,9 +133,10 @@ class OpenAIProvider(BaseProvider):
             )
             
         except Exception as e:
-            logger.error(f"OpenAI completion error: {e}")
+            logger.error("OpenAI completion error: {}", e)
             raise
     
+    @throttle
     async def chat_completion_stream(
         self,
         messages: List[ChatMessage],
@@ -123,10 +144,7 @@ class OpenAIProvider(BaseProvider):
     ) -> AsyncGenerator[StreamChunk, None]:
         """Generate a streaming chat completion."""
         try:
-            openai_messages = [
-                {"role": msg.role.value, "content": msg.content}
-                for msg in messages
-            ]
+            openai_messages = self._message_dicts(messages)
             
             completion_kwargs = {
                 "model": self.config.model_name,
@@ -155,43 +173,45 @@ class OpenAIProvider(BaseProvider):
                         chunk.usage.completion_tokens,
                         self.config.model_name
                     )
-                    usage = Usage(
+                    usage = Usage.model_construct(
                         prompt_tokens=chunk.usage.prompt_tokens,
                         completion_tokens=chunk.usage.completion_tokens,
                         total_tokens=chunk.usage.total_tokens,
                         cost=cost
                     )
                 
-                yield StreamChunk(
+                yield StreamChunk.model_construct(
                     id=chunk.id,
                     created=chunk.created,
                     model=chunk.model,
-                    choices=[choice.model_dump() for choice in chunk.choices],
+                    choices=[self._stream_choice(choice) for choice in chunk.choices],
                     usage=usage
                 )
                 
         except Exception as e:
-            logger.error(f"OpenAI streaming error: {e}")
+            logger.error("OpenAI streaming error: {}", e)
             raise
     
-    def _get_input_cost_per_1k(self, model: str) -> Optional[float]:
-        """Get input cost per 1K tokens for OpenAI models."""
-        costs = {
-            "gpt-4o": 0.005,
-            "gpt-4o-mini": 0.00015,
-            "gpt-4": 0.03,
-            "gpt-4-32k": 0.06,
-            "gpt-3.5-turbo": 0.0015,
-        }
-        return costs.get(model.lower())
-    
-    def _get_output_cost_per_1k(self, model: str) -> Optional[float]:
-        """Get output cost per 1K tokens for OpenAI models."""
-        costs = {
-            "gpt-4o": 0.015,
-            "gpt-4o-mini": 0.0006,
-            "gpt-4": 0.06,
-            "gpt-4-32k": 0.12,
-            "gpt-3.5-turbo": 0.002,
+    @staticmethod
+    def _stream_choice(choice: Any) -> Dict[str, Any]:
+        """Plain dict for a streamed choice, read directly instead of model_dump()."""
+        delta = choice.delta
+        # Chunks carrying anything beyond role/content/tool_calls (logprobs,
+        # refusals, audio, provider extras) keep the full dump
+        if _has_unread_fields(choice, _READ_CHOICE_FIELDS) or (
+            delta is not None and _has_unread_fields(delta, _READ_DELTA_FIELDS)
+        ):
+            return choice.model_dump()
+        
+        delta_dict: Dict[str, Any] = {}
+        if delta is not None:
+            delta_dict["role"] = delta.role
+            delta_dict["content"] = delta.content
+            if delta.tool_calls:
+                delta_dict["tool_calls"] = [call.model_dump() for call in delta.tool_calls]
+        
+        return {
+            "index": choice.index,
+            "delta": delta_dict,
+            "finish_reason": choice.finish_reason,
         }
-        return costs.get(model.lower())
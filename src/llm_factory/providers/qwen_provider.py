@@ -2,19 +2,36 @@
 Qwen provider implementation.
 """
 
-import json
-from typing import Any, AsyncGenerator, Dict, List, Optional, Union
+from typing import Any, AsyncGenerator, Dict, List, Union
 
 import httpx
+import orjson
 from loguru import logger
 
-from ..models import ChatMessage, ChatResponse, ModelConfig, StreamChunk, Usage
-from .base import BaseProvider
+from ..models import ChatMessage, ChatResponse, ModelConfig, StreamChunk
+from .base import BaseProvider, cache_responses, iter_sse_data, throttle
 
 
 class QwenProvider(BaseProvider):
     """Qwen provider implementation."""
     
+    # Prices in USD per 1K tokens, keyed by lowercase model name
+    _INPUT_COSTS_PER_1K = {
+        "qwen-turbo": 0.002,
+        "qwen-plus": 0.004,
+        "qwen-max": 0.02,
+        "qwen2-72b-instruct": 0.004,
+        "qwen2-7b-instruct": 0.001,
+    }
+    _OUTPUT_COSTS_PER_1K = {
+        "qwen-turbo": 0.006,
+        "qwen-plus": 0.012,
+        "qwen-max": 0.06,
+        "qwen2-72b-instruct": 0.012,
+        "qwen2-7b-instruct": 0.003,
+    }
+    _DEFAULT_TEMPERATURE = 0.7
+    
     def _setup_client(self) -> None:
         """Setup Qwen client."""
         self.base_url = self.config.api_base or "https://dashscope.aliyuncs.com/api/v1"
@@ -22,7 +39,53 @@ class QwenProvider(BaseProvider):
             "Authorization": f"Bearer {self.config.api_key}",
             "Content-Type": "application/json",
         }
+        self._generation_url = f"{self.base_url}/services/aigc/text-generation/generation"
+        # Generation parameters that do not depend on the request, built once
+        self._default_params = {
+            "temperature": self._effective_temperature({}),
+            "max_tokens": self.config.max_tokens or 2000,
+            "top_p": self.config.top_p or 0.8,
+        }
+        
+        proxy_url = self._proxy_url()
+        
+        # One pooled client per provider keeps connections to dashscope alive
+        # between calls instead of paying a TLS handshake per request; with
+        # http2 concurrent requests also share a multiplexed connection
+        self.client = httpx.AsyncClient(
+            http2=self._use_http2(),
+            proxy=proxy_url,
+            timeout=httpx.Timeout(self.config.timeout),
+            limits=self._setup_http_limits(),
+            headers=self.headers,
+        )
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        await self.client.aclose()
+    
+    def _build_payload(self, messages: List[ChatMessage], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Request payload, overriding only the per-request parameters."""
+        parameters = dict(self._default_params)
+        if "temperature" in kwargs:
+            parameters["temperature"] = kwargs["temperature"]
+        if "max_tokens" in kwargs:
+            parameters["max_tokens"] = kwargs["max_tokens"]
+        if "top_p" in kwargs:
+            parameters["top_p"] = kwargs["top_p"]
+        if kwargs.get("tools"):
+            parameters["tools"] = kwargs["tools"]
+        
+        return {
+            "model": self.config.model_name,
+            "input": {
+                "messages": self._message_dicts(messages)
+            },
+            "parameters": parameters
+        }
     
+    @cache_responses
+    @throttle
     async def chat_completion(
         self,
         messages: List[ChatMessage],
@@ -30,19 +93,10 @@ class QwenProvider(BaseProvider):
     ) -> Union[ChatResponse, AsyncGenerator[StreamChunk, None]]:
         """Generate a chat completion."""
         if kwargs.get("stream", self.config.stream):
-            return self._chat_completion_stream_wrapper(messages, **kwargs)
+            return self.chat_completion_stream(messages, **kwargs)
         
         return await self._chat_completion_non_stream(messages, **kwargs)
     
-    async def _chat_completion_stream_wrapper(
-        self,
-        messages: List[ChatMessage],
-        **kwargs: Any
-    ) -> AsyncGenerator[StreamChunk, None]:
-        """Wrapper for streaming chat completion."""
-        async for chunk in self.chat_completion_stream(messages, **kwargs):
-            yield chunk
-    
     async def _chat_completion_non_stream(
         self,
         messages: List[ChatMessage],
@@ -50,43 +104,13 @@ class QwenProvider(BaseProvider):
     ) -> ChatResponse:
         """Generate a non-streaming chat completion."""
         try:
-            qwen_messages = [
-                {"role": msg.role.value, "content": msg.content}
-                for msg in messages
-            ]
-            
-            payload = {
-                "model": self.config.model_name,
-                "input": {
-                    "messages": qwen_messages
-                },
-                "parameters": {
-                    "temperature": kwargs.get("temperature", self.config.temperature or 0.7),
-                    "max_tokens": kwargs.get("max_tokens", self.config.max_tokens or 2000),
-                    "top_p": kwargs.get("top_p", self.config.top_p or 0.8),
-                }
-            }
-            
-            if kwargs.get("tools"):
-                payload["parameters"]["tools"] = kwargs["tools"]
+            payload = self._build_payload(messages, kwargs)
             if kwargs.get("response_format") and kwargs["response_format"].get("type") == "json_object":
                 payload["parameters"]["result_format"] = "message"
             
-            proxy_config = self._setup_proxy()
-            timeout = httpx.Timeout(self.config.timeout)
-            
-            proxy_url = None
-            if proxy_config:
-                proxy_url = proxy_config.get("http") or proxy_config.get("https")
-            
-            async with httpx.AsyncClient(proxy=proxy_url, timeout=timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/services/aigc/text-generation/generation",
-                    headers=self.headers,
-                    json=payload
-                )
-                response.raise_for_status()
-                result = response.json()
+            response = await self.client.post(self._generation_url, content=orjson.dumps(payload))
+            response.raise_for_status()
+            result = orjson.loads(response.content)
             
             if "output" not in result:
                 raise ValueError(f"Invalid Qwen response: {result}")
@@ -94,15 +118,10 @@ class QwenProvider(BaseProvider):
             output = result["output"]
             usage_info = result.get("usage", {})
             
-            usage = Usage(
-                prompt_tokens=usage_info.get("input_tokens", 0),
-                completion_tokens=usage_info.get("output_tokens", 0),
-                total_tokens=usage_info.get("total_tokens", 0),
-                cost=self._calculate_cost(
-                    usage_info.get("input_tokens", 0),
-                    usage_info.get("output_tokens", 0),
-                    self.config.model_name
-                )
+            usage = self._create_usage(
+                usage_info.get("input_tokens", 0),
+                usage_info.get("output_tokens", 0),
+                usage_info.get("total_tokens")
             )
             
             choices = [{
@@ -115,7 +134,7 @@ class QwenProvider(BaseProvider):
                 "finish_reason": output.get("finish_reason", "stop")
             }]
             
-            return ChatResponse(
+            return ChatResponse.model_construct(
                 id=self._generate_id(),
                 created=self._get_current_timestamp(),
                 model=self.config.model_name,
@@ -124,9 +143,10 @@ class QwenProvider(BaseProvider):
             )
             
         except Exception as e:
-            logger.error(f"Qwen completion error: {e}")
+            logger.error("Qwen completion error: {}", e)
             raise
     
+    @throttle
     async def chat_completion_stream(
         self,
         messages: List[ChatMessage],
@@ -134,109 +154,53 @@ class QwenProvider(BaseProvider):
     ) -> AsyncGenerator[StreamChunk, None]:
         """Generate a streaming chat completion."""
         try:
-            qwen_messages = [
-                {"role": msg.role.value, "content": msg.content}
-                for msg in messages
-            ]
-            
-            payload = {
-                "model": self.config.model_name,
-                "input": {
-                    "messages": qwen_messages
-                },
-                "parameters": {
-                    "temperature": kwargs.get("temperature", self.config.temperature or 0.7),
-                    "max_tokens": kwargs.get("max_tokens", self.config.max_tokens or 2000),
-                    "top_p": kwargs.get("top_p", self.config.top_p or 0.8),
-                    "incremental_output": True
-                }
-            }
-            
-            if kwargs.get("tools"):
-                payload["parameters"]["tools"] = kwargs["tools"]
+            payload = self._build_payload(messages, kwargs)
+            payload["parameters"]["incremental_output"] = True
             
-            proxy_config = self._setup_proxy()
-            timeout = httpx.Timeout(self.config.timeout)
-            
-            proxy_url = None
-            if proxy_config:
-                proxy_url = proxy_config.get("http") or proxy_config.get("https")
-            
-            async with httpx.AsyncClient(proxy=proxy_url, timeout=timeout) as client:
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/services/aigc/text-generation/generation",
-                    headers=self.headers,
-                    json=payload
-                ) as response:
-                    response.raise_for_status()
+            async with self.client.stream("POST", self._generation_url, content=orjson.dumps(payload)) as response:
+                response.raise_for_status()
+                
+                # Every chunk of a stream shares one id and timestamp
+                stream_id = self._generate_id()
+                created = self._get_current_timestamp()
+                
+                async for data in iter_sse_data(response):
+                    if data == b"[DONE]":
+                        break
                     
-                    async for line in response.aiter_lines():
-                        if line.startswith("data: "):
-                            data = line[6:]
-                            if data == "[DONE]":
-                                break
-                            
-                            try:
-                                chunk_data = json.loads(data)
-                                output = chunk_data.get("output", {})
-                                usage_info = chunk_data.get("usage", {})
-                                
-                                usage = None
-                                if usage_info:
-                                    usage = Usage(
-                                        prompt_tokens=usage_info.get("input_tokens", 0),
-                                        completion_tokens=usage_info.get("output_tokens", 0),
-                                        total_tokens=usage_info.get("total_tokens", 0),
-                                        cost=self._calculate_cost(
-                                            usage_info.get("input_tokens", 0),
-                                            usage_info.get("output_tokens", 0),
-                                            self.config.model_name
-                                        )
-                                    )
-                                
-                                choices = [{
-                                    "index": 0,
-                                    "delta": {
-                                        "role": "assistant",
-                                        "content": output.get("text", "")
-                                    },
-                                    "finish_reason": output.get("finish_reason")
-                                }]
-                                
-                                yield StreamChunk(
-                                    id=self._generate_id(),
-                                    created=self._get_current_timestamp(),
-                                    model=self.config.model_name,
-                                    choices=choices,
-                                    usage=usage
-                                )
-                                
-                            except json.JSONDecodeError:
-                                continue
-                                
+                    try:
+                        chunk_data = orjson.loads(data)
+                        output = chunk_data.get("output", {})
+                        usage_info = chunk_data.get("usage", {})
+                        
+                        usage = None
+                        if usage_info:
+                            usage = self._create_usage(
+                                usage_info.get("input_tokens", 0),
+                                usage_info.get("output_tokens", 0),
+                                usage_info.get("total_tokens")
+                            )
+                        
+                        choices = [{
+                            "index": 0,
+                            "delta": {
+                                "role": "assistant",
+                                "content": output.get("text", "")
+                            },
+                            "finish_reason": output.get("finish_reason")
+                        }]
+                        
+                        yield StreamChunk.model_construct(
+                            id=stream_id,
+                            created=created,
+                            model=self.config.model_name,
+                            choices=choices,
+                            usage=usage
+                        )
+                        
+                    except orjson.JSONDecodeError:
+                        continue
+                        
         except Exception as e:
-            logger.error(f"Qwen streaming error: {e}")
+            logger.error("Qwen streaming error: {}", e)
             raise
-    
-    def _get_input_cost_per_1k(self, model: str) -> Optional[float]:
-        """Get input cost per 1K tokens for Qwen models."""
-        costs = {
-            "qwen-turbo": 0.002,
-            "qwen-plus": 0.004,
-            "qwen-max": 0.02,
-            "qwen2-72b-instruct": 0.004,
-            "qwen2-7b-instruct": 0.001,
-        }
-        return costs.get(model.lower())
-    
-    def _get_output_cost_per_1k(self, model: str) -> Optional[float]:
-        """Get output cost per 1K tokens for Qwen models."""
-        costs = {
-            "qwen-turbo": 0.006,
-            "qwen-plus": 0.012,
-            "qwen-max": 0.06,
-            "qwen2-72b-instruct": 0.012,
-            "qwen2-7b-instruct": 0.003,
-        }
-        return costs.get(model.lower())
@@ -2,75 +2,149 @@
 Configuration utilities.
 """
 
+import functools
 import os
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
 
 import yaml
 from loguru import logger
 
-from ..models import ModelConfig, ProviderType
+from ..models import ModelConfig
+from ..providers import ProviderType
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YamlLoader
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_yaml_file(path: str, mtime_ns: int) -> Any:
+    """Parse a YAML file; cached per path and modification time."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+
+class _EnvProviderSpec(NamedTuple):
+    """Environment variables that describe the accounts of one provider."""
+    provider: ProviderType
+    keys_var: str
+    key_var: str
+    model_var: str
+    default_model: str
+    # ModelConfig field -> (environment variable, default)
+    extras: Dict[str, Tuple[str, Optional[str]]]
+    # (list variable, single variable) for providers with one base per key
+    bases_vars: Optional[Tuple[str, str]] = None
+    
+    @property
+    def proxy_prefix(self) -> str:
+        """Prefix of the provider-specific proxy variables, e.g. QWEN_HTTPS_PROXY."""
+        return self.provider.value.upper()
+
+
+_ENV_PROVIDER_SPECS = (
+    _EnvProviderSpec(
+        ProviderType.OPENAI, "OPENAI_API_KEYS", "OPENAI_API_KEY", "OPENAI_MODEL", "gpt-4o",
+        {"api_version": ("OPENAI_API_VERSION", "2024-02-15-preview")},
+        bases_vars=("OPENAI_API_BASES", "OPENAI_API_BASE"),
+    ),
+    _EnvProviderSpec(
+        ProviderType.QWEN, "QWEN_API_KEYS", "QWEN_API_KEY", "QWEN_MODEL", "qwen-turbo",
+        {"api_base": ("QWEN_API_BASE", None)},
+    ),
+    _EnvProviderSpec(
+        ProviderType.DEEPSEEK, "DEEPSEEK_API_KEYS", "DEEPSEEK_API_KEY", "DEEPSEEK_MODEL", "deepseek-chat",
+        {"api_base": ("DEEPSEEK_API_BASE", None)},
+    ),
+    _EnvProviderSpec(
+        ProviderType.CLAUDE, "CLAUDE_ACCESS_KEYS", "CLAUDE_ACCESS_KEY", "CLAUDE_MODEL",
+        "anthropic.claude-3-5-sonnet-20241022-v2:0",
+        {"api_base": ("CLAUDE_SECRET_KEY", None), "region": ("CLAUDE_REGION", "us-east-1")},
+    ),
+    _EnvProviderSpec(
+        ProviderType.GEMINI, "GEMINI_API_KEYS", "GEMINI_API_KEY", "GEMINI_MODEL", "gemini-2.0-flash-exp",
+        {"project_id": ("GEMINI_PROJECT_ID", None), "region": ("GEMINI_REGION", None)},
+    ),
+)
+
+
+# All environment variables read by _configs_from_env_values
+_ENV_VARS = tuple(dict.fromkeys(
+    var
+    for spec in _ENV_PROVIDER_SPECS
+    for var in (
+        spec.keys_var, spec.key_var, spec.model_var,
+        *(var for var, _ in spec.extras.values()),
+        *(spec.bases_vars or ()),
+        f"{spec.proxy_prefix}_HTTP_PROXY", f"{spec.proxy_prefix}_HTTPS_PROXY",
+    )
+)) + ("HTTP_PROXY", "HTTPS_PROXY")
+
+
+def _split_csv(value: str) -> List[str]:
+    """Split a comma-separated string, dropping blank entries."""
+    return [part for part in map(str.strip, value.split(",")) if part]
+
+
+def _env_list(env: Mapping[str, str], list_var: str, single_var: str) -> List[str]:
+    """Read a comma-separated environment variable, falling back to its single-value form."""
+    values = _split_csv(env.get(list_var, ""))
+    if not values and env.get(single_var):  # 兼容单个值的情况
+        values = [env[single_var]]
+    return values
 
 
 def load_config_from_env() -> List[ModelConfig]:
     """Load configuration from environment variables."""
+    env = os.environ
+    # Configs are rebuilt only when one of the variables they read changes;
+    # callers get copies since the cached ones are shared
+    configs = _configs_from_env_values(tuple(env.get(var) for var in _ENV_VARS))
+    return [config.model_copy() for config in configs]
+
+
+@functools.lru_cache(maxsize=1)
+def _configs_from_env_values(values: Tuple[Optional[str], ...]) -> Tuple[ModelConfig, ...]:
+    """Build provider configs from the values of _ENV_VARS, in order."""
+    env = {var: value for var, value in zip(_ENV_VARS, values) if value is not None}
     configs = []
     
-    if os.getenv("OPENAI_API_KEY"):
-        configs.append(ModelConfig(
-            provider=ProviderType.OPENAI,
-            model_name=os.getenv("OPENAI_MODEL", "gpt-4o"),
-            api_key=os.getenv("OPENAI_API_KEY"),
-            api_base=os.getenv("OPENAI_API_BASE"),
-            api_version=os.getenv("OPENAI_API_VERSION"),
-            proxy_config=_get_proxy_config("OPENAI"),
-        ))
-    
-    if os.getenv("QWEN_API_KEY"):
-        configs.append(ModelConfig(
-            provider=ProviderType.QWEN,
-            model_name=os.getenv("QWEN_MODEL", "qwen-turbo"),
-            api_key=os.getenv("QWEN_API_KEY"),
-            api_base=os.getenv("QWEN_API_BASE"),
-            proxy_config=_get_proxy_config("QWEN"),
-        ))
-    
-    if os.getenv("DEEPSEEK_API_KEY"):
-        configs.append(ModelConfig(
-            provider=ProviderType.DEEPSEEK,
-            model_name=os.getenv("DEEPSEEK_MODEL", "deepseek-chat"),
-            api_key=os.getenv("DEEPSEEK_API_KEY"),
-            api_base=os.getenv("DEEPSEEK_API_BASE"),
-            proxy_config=_get_proxy_config("DEEPSEEK"),
-        ))
-    
-    if os.getenv("CLAUDE_ACCESS_KEY"):
-        configs.append(ModelConfig(
-            provider=ProviderType.CLAUDE,
-            model_name=os.getenv("CLAUDE_MODEL", "anthropic.claude-3-5-sonnet-20241022-v2:0"),
-            api_key=os.getenv("CLAUDE_ACCESS_KEY"),
-            api_base=os.getenv("CLAUDE_SECRET_KEY"),
-            region=os.getenv("CLAUDE_REGION", "us-east-1"),
-            proxy_config=_get_proxy_config("CLAUDE"),
-        ))
-    
-    if os.getenv("GEMINI_API_KEY"):
-        configs.append(ModelConfig(
-            provider=ProviderType.GEMINI,
-            model_name=os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp"),
-            api_key=os.getenv("GEMINI_API_KEY"),
-            project_id=os.getenv("GEMINI_PROJECT_ID"),
-            region=os.getenv("GEMINI_REGION"),
-            proxy_config=_get_proxy_config("GEMINI"),
-        ))
+    for spec in _ENV_PROVIDER_SPECS:
+        api_keys = _env_list(env, spec.keys_var, spec.key_var)
+        if not api_keys:
+            continue
+        
+        extra = {field: env.get(var, default) for field, (var, default) in spec.extras.items()}
+        if spec.bases_vars:
+            # 每个key对应一个base，数量不一致时跳过该provider
+            api_bases = _env_list(env, *spec.bases_vars)
+            if len(api_bases) != len(api_keys):
+                continue
+        else:
+            api_bases = [extra.pop("api_base", None)] * len(api_keys)
+        
+        model_name = env.get(spec.model_var, spec.default_model)
+        proxy_config = _get_proxy_config(spec.proxy_prefix, env)
+        for api_key, api_base in zip(api_keys, api_bases):
+            configs.append(ModelConfig(
+                provider=spec.provider,
+                model_name=model_name,
+                api_key=api_key,
+                api_base=api_base,
+                proxy_config=proxy_config,
+                **extra,
+            ))
     
-    return configs
+    return tuple(configs)
 
 
 def load_config_from_file(file_path: str) -> List[ModelConfig]:
     """Load configuration from YAML file."""
     try:
-        with open(file_path, 'r') as f:
-            data = yaml.safe_load(f)
+        # Parsed with libyaml when available and cached until the file changes;
+        # the configs are rebuilt each call since callers may modify them
+        data = _parse_yaml_file(os.path.abspath(file_path), os.stat(file_path).st_mtime_ns)
         
         configs = []
         for provider_data in data.get('providers', []):
@@ -83,10 +157,10 @@ def load_config_from_file(file_path: str) -> List[ModelConfig]:
         return []
 
 
-def _get_proxy_config(provider: str) -> Optional[Dict[str, str]]:
+def _get_proxy_config(provider: str, env: Mapping[str, str]) -> Optional[Dict[str, str]]:
     """Get proxy configuration for a specific provider."""
-    http_proxy = os.getenv(f"{provider}_HTTP_PROXY") or os.getenv("HTTP_PROXY")
-    https_proxy = os.getenv(f"{provider}_HTTPS_PROXY") or os.getenv("HTTPS_PROXY")
+    http_proxy = env.get(f"{provider}_HTTP_PROXY") or env.get("HTTP_PROXY")
+    https_proxy = env.get(f"{provider}_HTTPS_PROXY") or env.get("HTTPS_PROXY")
     
     if http_proxy or https_proxy:
         proxy_config = {}
@@ -2,17 +2,95 @@
 Metrics collection utilities.
 """
 
+import math
 import time
+from array import array
 from typing import Dict, List, Optional
 
 from loguru import logger
 
 
+class _Aggregate:
+    """Running totals for a set of recorded requests."""
+    
+    __slots__ = ("requests", "successes", "tokens", "cost", "latency_sum", "latency_count")
+    
+    def __init__(self):
+        self.requests = 0
+        self.successes = 0
+        self.tokens = 0
+        self.cost = 0.0
+        self.latency_sum = 0.0
+        self.latency_count = 0
+    
+    def add(self, total_tokens: int, cost: Optional[float], latency: Optional[float], success: bool) -> None:
+        self.requests += 1
+        if success:
+            self.successes += 1
+        self.tokens += total_tokens
+        if cost:
+            self.cost += cost
+        if latency:
+            self.latency_sum += latency
+            self.latency_count += 1
+
+
 class MetricsCollector:
     """Collect and track metrics for LLM usage."""
     
-    def __init__(self):
-        self.metrics: List[Dict] = []
+    def __init__(self, collect_raw: bool = True, log_every: int = 0):
+        # Per-request records; summaries come from the running aggregates, so
+        # long-running services can turn these off to keep memory flat
+        self.collect_raw = collect_raw
+        # Log the running totals every log_every requests (0 = never)
+        self.log_every = log_every
+        self._total = _Aggregate()
+        self._by_provider: Dict[str, _Aggregate] = {}
+        self._reset_records()
+    
+    def _reset_records(self) -> None:
+        """Start empty per-request record columns."""
+        # One typed array per field instead of a dict per request; provider and
+        # model names are stored once and referenced by index
+        self._names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self._timestamps = array("d")
+        self._provider_ids = array("I")
+        self._model_ids = array("I")
+        self._prompt_tokens = array("q")
+        self._completion_tokens = array("q")
+        self._costs = array("d")  # NaN when not reported
+        self._latencies = array("d")  # NaN when not reported
+        self._successes = array("b")
+        self._errors: Dict[int, str] = {}
+    
+    def _name_id(self, name: str) -> int:
+        """Index of name in the interned name table."""
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+        return name_id
+    
+    @property
+    def metrics(self) -> List[Dict]:
+        """Recorded requests as dicts, built on demand from the record columns."""
+        names = self._names
+        return [
+            {
+                "timestamp": self._timestamps[i],
+                "provider": names[self._provider_ids[i]],
+                "model": names[self._model_ids[i]],
+                "prompt_tokens": self._prompt_tokens[i],
+                "completion_tokens": self._completion_tokens[i],
+                "total_tokens": self._prompt_tokens[i] + self._completion_tokens[i],
+                "cost": None if math.isnan(self._costs[i]) else self._costs[i],
+                "latency": None if math.isnan(self._latencies[i]) else self._latencies[i],
+                "success": bool(self._successes[i]),
+                "error": self._errors.get(i),
+            }
+            for i in range(len(self._timestamps))
+        ]
     
     def record_request(
         self,
@@ -26,55 +104,69 @@ class MetricsCollector:
         error: Optional[str] = None,
     ) -> None:
         """Record a request metric."""
-        metric = {
-            "timestamp": time.time(),
-            "provider": provider,
-            "model": model,
-            "prompt_tokens": prompt_tokens,
-            "completion_tokens": completion_tokens,
-            "total_tokens": prompt_tokens + completion_tokens,
-            "cost": cost,
-            "latency": latency,
-            "success": success,
-            "error": error,
-        }
+        total_tokens = prompt_tokens + completion_tokens
+        self._total.add(total_tokens, cost, latency, success)
+        aggregate = self._by_provider.get(provider)
+        if aggregate is None:
+            aggregate = self._by_provider[provider] = _Aggregate()
+        aggregate.add(total_tokens, cost, latency, success)
+        
+        total = self._total
+        if self.log_every and total.requests % self.log_every == 0:
+            logger.info(
+                "Metrics: {} requests, {} successful, {} tokens, ${:.4f}",
+                total.requests, total.successes, total.tokens, total.cost
+            )
         
-        self.metrics.append(metric)
-        logger.info(f"Recorded metric: {metric}")
+        if not self.collect_raw:
+            return
+        
+        if error is not None:
+            self._errors[len(self._timestamps)] = error
+        self._timestamps.append(time.time())
+        self._provider_ids.append(self._name_id(provider))
+        self._model_ids.append(self._name_id(model))
+        self._prompt_tokens.append(prompt_tokens)
+        self._completion_tokens.append(completion_tokens)
+        self._costs.append(math.nan if cost is None else cost)
+        self._latencies.append(math.nan if latency is None else latency)
+        self._successes.append(success)
+        logger.trace(
+            "Recorded metric: provider={} model={} tokens={} cost={} latency={} success={}",
+            provider, model, total_tokens, cost, latency, success
+        )
     
     def get_summary(self, provider: Optional[str] = None) -> Dict:
         """Get summary statistics."""
-        filtered_metrics = self.metrics
-        if provider:
-            filtered_metrics = [m for m in self.metrics if m["provider"] == provider]
-        
-        if not filtered_metrics:
+        aggregate = self._by_provider.get(provider) if provider else self._total
+        if aggregate is None or not aggregate.requests:
             return {"total_requests": 0}
         
-        total_requests = len(filtered_metrics)
-        successful_requests = len([m for m in filtered_metrics if m["success"]])
-        total_tokens = sum(m["total_tokens"] for m in filtered_metrics)
-        total_cost = sum(m["cost"] for m in filtered_metrics if m["cost"])
-        
-        latencies = [m["latency"] for m in filtered_metrics if m["latency"]]
-        avg_latency = sum(latencies) / len(latencies) if latencies else 0
-        
-        return {
-            "total_requests": total_requests,
-            "successful_requests": successful_requests,
-            "success_rate": successful_requests / total_requests if total_requests > 0 else 0,
-            "total_tokens": total_tokens,
-            "total_cost": total_cost,
-            "average_latency": avg_latency,
-            "provider": provider,
-        }
+        return self._summarize(aggregate, provider)
     
     def get_provider_breakdown(self) -> Dict[str, Dict]:
         """Get metrics breakdown by provider."""
-        providers = set(m["provider"] for m in self.metrics)
-        return {provider: self.get_summary(provider) for provider in providers}
+        return {
+            provider: self._summarize(aggregate, provider)
+            for provider, aggregate in self._by_provider.items()
+        }
+    
+    @staticmethod
+    def _summarize(aggregate: _Aggregate, provider: Optional[str]) -> Dict:
+        """Summary dict for one set of running totals."""
+        return {
+            "total_requests": aggregate.requests,
+            "successful_requests": aggregate.successes,
+            "success_rate": aggregate.successes / aggregate.requests,
+            "total_tokens": aggregate.tokens,
+            "total_cost": aggregate.cost,
+            "average_latency": aggregate.latency_sum / aggregate.latency_count if aggregate.latency_count else 0,
+            "provider": provider,
+        }
     
     def clear_metrics(self) -> None:
         """Clear all collected metrics."""
-        self.metrics.clear()
+        self._reset_records()
+        self._total = _Aggregate()
+        self._by_provider.clear()
         logger.info("Cleared all metrics")
@@ -3,6 +3,7 @@ Proxy context manager utilities.
 """
 
 import os
+import warnings
 from contextlib import contextmanager
 from typing import Dict, Optional
 
@@ -12,9 +13,18 @@ def ProxyContext(proxy_config: Optional[Dict[str, str]]):
     """
     Context manager for setting proxy environment variables.
     
+    Deprecated: it mutates process-wide os.environ, which races between
+    concurrent requests. Providers take their proxy from
+    ModelConfig.proxy_config when their HTTP client is built.
+    
     Args:
         proxy_config: Dictionary with 'http' and 'https' proxy URLs
     """
+    warnings.warn(
+        "ProxyContext is deprecated; set proxy_config on the provider's ModelConfig instead",
+        DeprecationWarning,
+        stacklevel=3
+    )
     if not proxy_config:
         yield
         return
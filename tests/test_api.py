@@ -2,14 +2,9 @@
 Test script for the FastAPI interface.
 """
 
-import os
-import sys
 import pytest
 from fastapi.testclient import TestClient
 
-# Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from src.llm_factory.api.app import create_app
 
 
@@ -60,4 +55,137 @@ def test_chat_completion(client):
         result = response.json()
         print(f"  Response preview: {str(result)[:200]}...")
     else:
-        print(f"  Error (expected without real API keys): {response.text[:200]}...") 
\ No newline at end of file
+        print(f"  Error (expected without real API keys): {response.text[:200]}...") 
+
+def test_chat_completion_stream(client, monkeypatch):
+    """Test streaming chat completion emits SSE frames."""
+    from src.llm_factory.api import routes
+    from src.llm_factory.models import StreamChunk
+
+    class StubFactory:
+        async def stream_async(self, messages, **kwargs):
+            yield StreamChunk(
+                id="chatcmpl-1",
+                created=0,
+                model="gpt-4o",
+                choices=[{"index": 0, "delta": {"content": "Hi"}, "finish_reason": None}],
+            )
+
+    monkeypatch.setattr(routes, "_factory", StubFactory())
+    chat_request = {
+        "model": "gpt-4o",
+        "messages": [{"role": "user", "content": "Hello, world!"}],
+        "stream": True
+    }
+    response = client.post("/api/v1/chat/completions", json=chat_request)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [f for f in response.text.split("\n\n") if f]
+    assert frames[0].startswith('data: {"id":"chatcmpl-1"')
+    assert frames[-1] == "data: [DONE]"
+
+
+def test_chat_completion_forwards_only_set_fields(client, monkeypatch):
+    """Test that unset request fields are not forwarded to the factory."""
+    from src.llm_factory.api import routes
+    from src.llm_factory.models import ChatResponse
+
+    captured = {}
+
+    class StubFactory:
+        async def chat_async(self, messages, **kwargs):
+            captured.update(kwargs)
+            return ChatResponse(id="chatcmpl-1", created=0, model="gpt-4o", choices=[])
+
+    monkeypatch.setattr(routes, "_factory", StubFactory())
+    chat_request = {
+        "model": "gpt-4o",
+        "messages": [{"role": "user", "content": "Hello, world!"}],
+        "temperature": 0.2
+    }
+    response = client.post("/api/v1/chat/completions", json=chat_request)
+    assert response.status_code == 200
+    assert captured == {"model": "gpt-4o", "temperature": 0.2, "stream": False}
+
+
+def test_models_endpoint_tracks_configure(client, monkeypatch):
+    """Test that the cached model list is refreshed after reconfiguration."""
+    from src.llm_factory.api import routes
+
+    monkeypatch.setattr(routes, "_factory", None)
+    monkeypatch.setattr(routes, "_models_cache", None)
+    monkeypatch.setattr(routes, "_status_cache", None)
+    config = {
+        "providers": [
+            {"provider": "deepseek", "model_name": "deepseek-chat", "api_key": "test-key"},
+            {"provider": "qwen", "model_name": "qwen-turbo", "api_key": "test-key"},
+        ]
+    }
+    response = client.post("/api/v1/factory/configure", json=config)
+    assert response.status_code == 200
+    
+    response = client.get("/api/v1/models")
+    assert response.status_code == 200
+    assert [m["id"] for m in response.json()["data"]] == ["deepseek-chat", "qwen-turbo"]
+    
+    config["providers"] = config["providers"][:1]
+    client.post("/api/v1/factory/configure", json=config)
+    response = client.get("/api/v1/models")
+    assert [m["id"] for m in response.json()["data"]] == ["deepseek-chat"]
+    assert response.json()["data"][0]["owned_by"] == "deepseek"
+    
+    response = client.get("/api/v1/providers/status")
+    assert response.json()["total_providers"] == 1
+
+
+def test_cors_origins(monkeypatch):
+    """Test that CORS is only enabled for configured origins."""
+    monkeypatch.setenv("CORS_ORIGINS", "https://app.example.com")
+    cors_client = TestClient(create_app())
+    headers = {"Origin": "https://app.example.com", "Access-Control-Request-Method": "POST"}
+    response = cors_client.options("/api/v1/chat/completions", headers=headers)
+    assert response.headers["access-control-allow-origin"] == "https://app.example.com"
+    
+    monkeypatch.delenv("CORS_ORIGINS")
+    response = TestClient(create_app()).get("/health", headers={"Origin": "https://app.example.com"})
+    assert "access-control-allow-origin" not in response.headers
+
+
+def test_lifespan_warms_and_closes_factory(monkeypatch):
+    """Test that the factory is built on startup and closed on shutdown."""
+    from src.llm_factory.api import routes
+
+    events = []
+
+    class StubFactory:
+        async def aclose(self):
+            events.append("closed")
+
+    def create():
+        events.append("created")
+        return StubFactory()
+
+    monkeypatch.setattr(routes, "_factory", None)
+    monkeypatch.setattr(routes.LLMFactory, "create", staticmethod(create))
+    with TestClient(create_app()) as lifespan_client:
+        assert events == ["created"]
+        assert lifespan_client.get("/health").status_code == 200
+    assert events == ["created", "closed"]
+    assert routes._factory is None
+
+
+def test_configure_factory_validates_providers(client, monkeypatch):
+    """Test that invalid provider configs are rejected at the request boundary."""
+    from src.llm_factory.api import routes
+    
+    monkeypatch.setattr(routes, "_factory", None)
+    response = client.post("/api/v1/factory/configure", json={"providers": []})
+    assert response.status_code == 422
+    
+    response = client.post(
+        "/api/v1/factory/configure",
+        json={"providers": [{"provider": "unknown", "model_name": "some-model"}]},
+    )
+    assert response.status_code == 422
+    assert "provider" in response.text
+    assert routes._factory is None
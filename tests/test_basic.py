@@ -2,20 +2,15 @@
 Basic test script to verify the LLM Factory system works.
 """
 
-import os
-import sys
 import pytest
 
-# Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
 from src.llm_factory import LLMFactory, ModelConfig, ProviderType, ChatMessage
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def basic_config():
     """Basic configuration for testing."""
-    return ModelConfig(
+    return ModelConfig.model_construct(
         provider=ProviderType.OPENAI,
         model_name="gpt-4o",
         api_key="test-key",
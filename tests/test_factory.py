@@ -2,6 +2,8 @@
 Tests for the LLM Factory.
 """
 
+import asyncio
+
 import pytest
 from unittest.mock import Mock, AsyncMock
 import time
@@ -10,20 +12,24 @@ from src.llm_factory.models import ChatResponse
 from src.llm_factory import LLMFactory, ModelConfig, ProviderType, ChatMessage
 
 
-def create_mock_chat_response(content: str = "Hello!") -> ChatResponse:
+def create_mock_chat_response(content: str = "Hello!", created: int = 1700000000) -> ChatResponse:
     """Create a mock ChatResponse object for testing."""
-    return ChatResponse(
+    return ChatResponse.model_construct(
         id="chatcmpl-123",
-        created=int(time.time()),
+        created=created,
         model="gpt-4o",
         choices=[{"message": {"content": content}}]
     )
 
 
-@pytest.fixture
+# Shared by the entry-point tests; nothing in the factory mutates a response
+HELLO_RESPONSE = create_mock_chat_response("Hello!")
+
+
+@pytest.fixture(scope="module")
 def mock_config():
     """Mock configuration for testing."""
-    return ModelConfig(
+    return ModelConfig.model_construct(
         provider=ProviderType.OPENAI,
         model_name="gpt-4o",
         api_key="test-key",
@@ -66,6 +72,138 @@ def test_factory_multiple_configs():
     assert len(factory.providers) == 2
 
 
+def test_round_robin_rotation():
+    """Test round-robin selection across all providers and per model."""
+    configs = [
+        ModelConfig(provider=ProviderType.DEEPSEEK, model_name="deepseek-chat", api_key=f"key-{i}")
+        for i in range(2)
+    ] + [ModelConfig(provider=ProviderType.QWEN, model_name="qwen-turbo", api_key="qwen-key")]
+    factory = LLMFactory(configs)
+    
+    picked = [factory._get_provider() for _ in range(4)]
+    assert picked == factory.providers + factory.providers[:1]
+    
+    picked = [factory._get_provider_for_model("deepseek-chat") for _ in range(3)]
+    assert [p.config.api_key for p in picked] == ["key-0", "key-1", "key-0"]
+
+
+def test_load_aware_strategies_prefer_idle_provider():
+    """Test that p2c and least_busy pick the provider with fewer requests in flight."""
+    configs = [
+        ModelConfig(provider=ProviderType.DEEPSEEK, model_name="deepseek-chat", api_key=f"key-{i}")
+        for i in range(2)
+    ]
+    factory = LLMFactory(configs)
+    busy, idle = factory.providers
+    
+    with factory._track_call(busy):
+        picked = {factory._get_provider("p2c") for _ in range(10)}
+        assert picked == {idle}
+        assert factory._get_provider_for_model("deepseek-chat", "p2c") is idle
+        assert {factory._get_provider("least_busy") for _ in range(4)} == {idle}
+    
+    assert factory._in_flight == [0, 0]
+
+
+def test_sticky_routes_session_to_same_provider():
+    """Test that the sticky strategy keeps a session on one provider."""
+    configs = [
+        ModelConfig(provider=ProviderType.DEEPSEEK, model_name="deepseek-chat", api_key=f"key-{i}")
+        for i in range(3)
+    ]
+    factory = LLMFactory(configs)
+    messages = [ChatMessage(role="user", content="Hello")]
+    
+    for kwargs in ({"session_id": "abc"}, {"session_id": "abc", "model": "deepseek-chat"}, {}):
+        kwargs["load_balance_strategy"] = "sticky"
+        picked = {factory._select_provider(messages, kwargs) for _ in range(5)}
+        assert len(picked) == 1
+    
+    # Sessionless conversations that share a system prompt still spread out
+    system = ChatMessage(role="system", content="You are a helpful assistant.")
+    picked = {
+        factory._select_provider([system, ChatMessage(role="user", content=f"Question {i}")],
+                                 {"load_balance_strategy": "sticky"})
+        for i in range(20)
+    }
+    assert len(picked) > 1
+
+
+async def test_failover_tries_next_providers_in_order():
+    """Test that failover starts with the provider after the failed one."""
+    configs = [
+        ModelConfig(provider=ProviderType.DEEPSEEK, model_name="deepseek-chat", api_key=f"key-{i}")
+        for i in range(3)
+    ]
+    factory = LLMFactory(configs)
+    calls = []
+    
+    for provider in factory.providers:
+        async def chat_completion(messages, _key=provider.config.api_key, **kwargs):
+            calls.append(_key)
+            if _key != "key-0":
+                raise RuntimeError("provider down")
+            return create_mock_chat_response()
+        provider.chat_completion = chat_completion
+    
+    factory._get_provider()  # the next request goes to key-1
+    response = await factory.chat_async("Hello")
+    
+    assert calls == ["key-1", "key-2", "key-0"]
+    assert response.choices[0]["message"]["content"] == "Hello!"
+
+
+async def test_hedged_chat_returns_fastest_provider():
+    """Test that hedge=True races two providers and cancels the slower one."""
+    configs = [
+        ModelConfig(provider=ProviderType.DEEPSEEK, model_name="deepseek-chat", api_key=f"key-{i}")
+        for i in range(2)
+    ]
+    factory = LLMFactory(configs)
+    slow, fast = factory.providers
+    cancelled = []
+    
+    async def slow_chat(messages, **kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+    
+    slow.chat_completion = slow_chat
+    fast.chat_completion = AsyncMock(return_value=create_mock_chat_response())
+    
+    response = await factory.chat_async("Hello", hedge=True)
+    await asyncio.sleep(0)
+    
+    assert response.choices[0]["message"]["content"] == "Hello!"
+    assert "hedge" not in fast.chat_completion.await_args.kwargs
+    assert cancelled == [True]
+    assert factory._in_flight == [0, 0]
+
+
+async def test_circuit_breaker_skips_failed_provider():
+    """Test that a failing provider is skipped until its backoff expires."""
+    configs = [
+        ModelConfig(provider=ProviderType.DEEPSEEK, model_name="deepseek-chat", api_key=f"key-{i}")
+        for i in range(2)
+    ]
+    factory = LLMFactory(configs)
+    broken, healthy = factory.providers
+    broken.chat_completion = AsyncMock(side_effect=RuntimeError("provider down"))
+    healthy.chat_completion = AsyncMock(return_value=create_mock_chat_response())
+    
+    for _ in range(4):
+        await factory.chat_async("Hello")
+    
+    assert broken.chat_completion.await_count == 1
+    assert healthy.chat_completion.await_count == 4
+    assert factory._is_open(broken)
+    
+    factory._open_until[0] = time.monotonic() - 1  # backoff elapsed
+    assert not factory._is_open(broken)
+
+
 def test_get_provider_status(factory):
     """Test provider status retrieval."""
     status = factory.get_provider_status()
@@ -74,29 +212,193 @@ def test_get_provider_status(factory):
     assert status["providers"][0]["type"] == "OpenAIProvider"
 
 
-@pytest.mark.asyncio
-async def test_chat_async_string_input(factory):
-    """Test async chat with string input."""
-    mock_response = create_mock_chat_response("Hello!")
-    factory.providers[0].chat_completion = AsyncMock(return_value=mock_response)
+@pytest.mark.parametrize("invoke", [
+    lambda factory: asyncio.run(factory.chat_async("Hello")),
+    lambda factory: factory.chat("Hello"),
+    lambda factory: factory("Hello"),
+], ids=["chat_async", "chat", "call"])
+def test_chat_entry_points_accept_string_input(factory, invoke):
+    """Test that the async, sync and callable interfaces all take a plain prompt."""
+    async def chat_completion(*args, **kwargs):
+        return HELLO_RESPONSE
     
-    response = await factory.chat_async("Hello")
+    factory.providers[0].chat_completion = chat_completion
+    
+    response = invoke(factory)
     assert response.choices[0]["message"]["content"] == "Hello!"
 
 
-def test_chat_sync(factory):
-    """Test synchronous chat."""
-    mock_response = create_mock_chat_response("Hello!")
-    factory.providers[0].chat_completion = AsyncMock(return_value=mock_response)
+def test_chat_sync_reuses_event_loop(factory):
+    """Test that synchronous calls share one background event loop until close()."""
+    import threading
     
-    response = factory.chat("Hello")
-    assert response.choices[0]["message"]["content"] == "Hello!"
+    loops = []
+    
+    async def chat_completion(*args, **kwargs):
+        loops.append(asyncio.get_running_loop())
+        assert threading.current_thread() is not threading.main_thread()
+        return create_mock_chat_response()
+    
+    factory.providers[0].chat_completion = chat_completion
+    factory.chat("Hello")
+    factory.chat("Hello again")
+    assert loops[0] is loops[1]
+    
+    factory.close()
+    assert loops[0].is_closed()
 
 
-def test_callable_interface(factory):
-    """Test callable interface."""
-    mock_response = create_mock_chat_response("Hello!")
-    factory.providers[0].chat_completion = AsyncMock(return_value=mock_response)
+def test_load_configs_from_env(monkeypatch):
+    """Test building provider configs from environment variables."""
+    for var in ("OPENAI_API_KEY", "OPENAI_API_BASE", "QWEN_API_KEYS", "DEEPSEEK_API_KEYS",
+                "DEEPSEEK_API_KEY", "CLAUDE_ACCESS_KEYS", "CLAUDE_ACCESS_KEY",
+                "GEMINI_API_KEYS", "GEMINI_API_KEY", "OPENAI_MODEL", "QWEN_MODEL"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("OPENAI_API_KEYS", "key-1, key-2")
+    monkeypatch.setenv("OPENAI_API_BASES", "https://a.openai.azure.com/,https://b.openai.azure.com/")
+    monkeypatch.setenv("QWEN_API_KEY", "qwen-key")
+    monkeypatch.setenv("QWEN_API_BASE", "https://qwen.example.com")
     
-    response = factory("Hello")
-    assert response.choices[0]["message"]["content"] == "Hello!"
+    configs = LLMFactory._load_configs_from_env()
+    
+    assert [(c.provider, c.api_key, c.api_base) for c in configs] == [
+        (ProviderType.OPENAI, "key-1", "https://a.openai.azure.com/"),
+        (ProviderType.OPENAI, "key-2", "https://b.openai.azure.com/"),
+        (ProviderType.QWEN, "qwen-key", "https://qwen.example.com"),
+    ]
+    assert configs[0].model_name == "gpt-4o"
+    assert configs[0].api_version == "2024-02-15-preview"
+    assert configs[2].model_name == "qwen-turbo"
+    
+    # Unchanged variables reuse the parsed configs, handed out as copies so
+    # one caller's changes never reach the next; a change is picked up
+    configs[0].model_name = "changed"
+    assert LLMFactory._load_configs_from_env()[0].model_name == "gpt-4o"
+    assert LLMFactory._load_configs_from_env() == LLMFactory._load_configs_from_env()
+    monkeypatch.setenv("QWEN_MODEL", "qwen-max")
+    assert LLMFactory._load_configs_from_env()[2].model_name == "qwen-max"
+
+
+async def test_aclose_closes_providers(factory):
+    """Test that closing the factory closes every provider."""
+    factory.providers[0].aclose = AsyncMock()
+    
+    await factory.aclose()
+    factory.providers[0].aclose.assert_awaited_once()
+
+
+def test_load_configs_from_yaml_caches_parse(tmp_path, monkeypatch):
+    """Test that YAML files are only re-parsed after they change."""
+    import os
+    from src.llm_factory import factory as factory_module
+    
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "providers:\n"
+        "  - provider: deepseek\n"
+        "    model_name: deepseek-chat\n"
+        "    api_key: ${TEST_DEEPSEEK_KEY}\n"
+    )
+    monkeypatch.setenv("TEST_DEEPSEEK_KEY", "key-1")
+    factory_module._parse_yaml_file.cache_clear()
+    
+    configs = LLMFactory._load_configs_from_yaml(str(config_file))
+    assert [c.api_key for c in configs] == ["key-1"]
+    
+    # Environment substitution still happens on every load
+    monkeypatch.setenv("TEST_DEEPSEEK_KEY", "key-2")
+    configs = LLMFactory._load_configs_from_yaml(str(config_file))
+    assert [c.api_key for c in configs] == ["key-2"]
+    assert factory_module._parse_yaml_file.cache_info().misses == 1
+    
+    config_file.write_text(config_file.read_text().replace("deepseek-chat", "deepseek-coder"))
+    stat = config_file.stat()
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    configs = LLMFactory._load_configs_from_yaml(str(config_file))
+    assert configs[0].model_name == "deepseek-coder"
+
+
+def test_load_configs_from_yaml_expands_key_lists(tmp_path, monkeypatch):
+    """Test that comma-separated ${VAR} values expand into multiple configs."""
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "providers:\n"
+        "  - provider: qwen\n"
+        "    model_name: ${TEST_QWEN_MODEL}\n"
+        "    api_key: ${TEST_QWEN_KEYS}\n"
+        "    api_base: https://qwen.example.com\n"
+    )
+    monkeypatch.setenv("TEST_QWEN_KEYS", "key-1, key-2")
+    monkeypatch.setenv("TEST_QWEN_MODEL", "qwen-max")
+    
+    configs = LLMFactory._load_configs_from_yaml(str(config_file))
+    
+    assert [c.api_key for c in configs] == ["key-1", "key-2"]
+    assert {c.model_name for c in configs} == {"qwen-max"}
+    assert {c.api_base for c in configs} == {"https://qwen.example.com"}
+
+
+def test_create_from_config_reuses_instance(tmp_path):
+    """Test that factories are shared per config file until it changes."""
+    import os
+    
+    config_file = tmp_path / "config.yaml"
+    other_file = tmp_path / "other.yaml"
+    for path, model in ((config_file, "deepseek-chat"), (other_file, "deepseek-coder")):
+        path.write_text(
+            "providers:\n"
+            "  - provider: deepseek\n"
+            f"    model_name: {model}\n"
+            "    api_key: test-key\n"
+        )
+    
+    factory = LLMFactory.create_from_config(str(config_file))
+    assert LLMFactory.create_from_config(str(config_file)) is factory
+    
+    other = LLMFactory.create_from_config(str(other_file))
+    assert other is not factory
+    assert other.configs[0].model_name == "deepseek-coder"
+    
+    # A closed instance is never handed out again
+    other.close()
+    assert LLMFactory.create_from_config(str(other_file)) is not other
+    
+    stat = config_file.stat()
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert LLMFactory.create_from_config(str(config_file)) is not factory
+
+
+async def test_failover_reuses_serialized_claude_body():
+    """Test that Claude failover sends the body serialized for the first attempt."""
+    import io
+    
+    pytest.importorskip("boto3")
+    configs = [
+        ModelConfig(
+            provider=ProviderType.CLAUDE,
+            model_name="anthropic.claude-3-5-sonnet-20241022-v2:0",
+            api_key=f"key-{i}",
+            api_base="secret",
+            region="us-east-1",
+        )
+        for i in range(2)
+    ]
+    factory = LLMFactory(configs)
+    bodies = []
+    
+    def invoke_model(failing):
+        def invoke(modelId, body):
+            bodies.append(body)
+            if failing:
+                raise RuntimeError("throttled")
+            return {"body": io.BytesIO(b'{"content": [{"text": "Hi!"}], "usage": {}}')}
+        return invoke
+    
+    first, second = factory.providers
+    first.client = Mock(invoke_model=invoke_model(True))
+    second.client = Mock(invoke_model=invoke_model(False))
+    
+    response = await factory.chat_async("Hello")
+    
+    assert response.choices[0]["message"]["content"] == "Hi!"
+    assert len(bodies) == 2 and bodies[0] is bodies[1]
@@ -1,22 +1,21 @@
 """
 Test script to isolate OpenAI provider issues.
+
+Unlike tests/test_providers.py, nothing here patches AsyncAzureOpenAI, so
+these tests exercise the real SDK client construction.
 """
 
-import os
-import sys
 import pytest
-
-# Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from openai import AsyncAzureOpenAI
 
 from src.llm_factory.models import ModelConfig
 from src.llm_factory.providers import ProviderType, OpenAIProvider
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def openai_config():
     """OpenAI configuration for testing."""
-    return ModelConfig(
+    return ModelConfig.model_construct(
         provider=ProviderType.OPENAI,
         model_name="gpt-4o",
         api_key="test-key",
@@ -28,15 +27,20 @@ def openai_config():
 
 def test_openai_provider_creation(openai_config):
     """Test OpenAI provider creation."""
-    try:
-        print(f"Config created: {openai_config}")
-        
-        provider = OpenAIProvider(openai_config)
-        assert provider is not None
-        print(f"✓ OpenAI provider created successfully")
-        
-    except Exception as e:
-        print(f"✗ OpenAI provider creation failed: {e}")
-        import traceback
-        traceback.print_exc()
-        pytest.fail("OpenAI provider creation failed") 
\ No newline at end of file
+    provider = OpenAIProvider(openai_config)
+    assert isinstance(provider.client, AsyncAzureOpenAI)
+
+
+def test_openai_provider_creation_with_proxy_and_limits():
+    """Test that proxy and pool settings build a custom HTTP client for the SDK."""
+    config = ModelConfig(
+        provider=ProviderType.OPENAI,
+        model_name="gpt-4o",
+        api_key="test-key",
+        api_base="https://test.openai.azure.com/",
+        proxy_config={"https": "http://proxy:8080"},
+        http_limits={"max_connections": 2000, "max_keepalive_connections": 1500},
+    )
+    
+    provider = OpenAIProvider(config)
+    assert isinstance(provider.client, AsyncAzureOpenAI)
@@ -6,13 +6,24 @@ import pytest
 from unittest.mock import Mock, patch
 
 from src.llm_factory.models import ModelConfig, ChatMessage, MessageRole
-from src.llm_factory.providers import ProviderType, OpenAIProvider, QwenProvider, DeepSeekProvider
+from src.llm_factory.providers import ProviderType
 
 
-@pytest.fixture
+# gpt-4o price for 1000 prompt and 500 completion tokens
+_EXPECTED_GPT4O_COST = 0.005 + 0.5 * 0.015
+
+
+@pytest.fixture(autouse=True, scope="module")
+def _patch_azure():
+    """Stub the Azure OpenAI SDK client once for every test in the module."""
+    with patch('src.llm_factory.providers.openai_provider.AsyncAzureOpenAI'):
+        yield
+
+
+@pytest.fixture(scope="module")
 def openai_config():
     """OpenAI configuration for testing."""
-    return ModelConfig(
+    return ModelConfig.model_construct(
         provider=ProviderType.OPENAI,
         model_name="gpt-4o",
         api_key="test-key",
@@ -21,85 +32,611 @@ def openai_config():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
+def openai_provider(_patch_azure, openai_config):
+    """OpenAI provider shared by tests that only exercise pure-Python helpers."""
+    from src.llm_factory.providers import OpenAIProvider
+    return OpenAIProvider(openai_config)
+
+
+@pytest.fixture(scope="module")
 def qwen_config():
     """Qwen configuration for testing."""
-    return ModelConfig(
+    return ModelConfig.model_construct(
         provider=ProviderType.QWEN,
         model_name="qwen-turbo",
         api_key="test-key",
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def deepseek_config():
     """DeepSeek configuration for testing."""
-    return ModelConfig(
+    return ModelConfig.model_construct(
         provider=ProviderType.DEEPSEEK,
         model_name="deepseek-chat",
         api_key="test-key",
     )
 
 
-def test_openai_provider_initialization(openai_config):
-    """Test OpenAI provider initialization."""
-    with patch('src.llm_factory.providers.openai_provider.AsyncAzureOpenAI'):
-        provider = OpenAIProvider(openai_config)
-        assert provider.config.model_name == "gpt-4o"
+@pytest.mark.parametrize("config_fixture, provider_class, base_url", [
+    ("openai_config", "OpenAIProvider", None),
+    ("qwen_config", "QwenProvider", "https://dashscope.aliyuncs.com/api/v1"),
+    ("deepseek_config", "DeepSeekProvider", "https://api.deepseek.com/v1"),
+])
+def test_provider_initialization(request, config_fixture, provider_class, base_url):
+    """Test provider initialization."""
+    from src.llm_factory import providers
+    
+    config = request.getfixturevalue(config_fixture)
+    provider = getattr(providers, provider_class)(config)
+    assert provider.config.model_name == config.model_name
+    if base_url is not None:
+        assert provider.base_url == base_url
 
 
-def test_qwen_provider_initialization(qwen_config):
-    """Test Qwen provider initialization."""
-    provider = QwenProvider(qwen_config)
-    assert provider.config.model_name == "qwen-turbo"
-    assert provider.base_url == "https://dashscope.aliyuncs.com/api/v1"
+def test_cost_calculation(openai_provider):
+    """Test cost calculation functionality."""
+    assert openai_provider._calculate_cost(1000, 500, "gpt-4o") == _EXPECTED_GPT4O_COST
 
 
-def test_deepseek_provider_initialization(deepseek_config):
-    """Test DeepSeek provider initialization."""
+def test_generated_ids_are_unique(deepseek_config):
+    """Test that generated response ids never repeat within a process."""
+    from src.llm_factory.providers import DeepSeekProvider
+    
     provider = DeepSeekProvider(deepseek_config)
-    assert provider.config.model_name == "deepseek-chat"
-    assert provider.base_url == "https://api.deepseek.com/v1"
+    ids = {provider._generate_id() for _ in range(1000)}
+    assert len(ids) == 1000
+    assert all(i.startswith("chatcmpl-") for i in ids)
 
 
-def test_cost_calculation():
-    """Test cost calculation functionality."""
+def test_message_conversion(openai_provider):
+    """Test message format conversion."""
+    messages = [
+        ChatMessage(role=MessageRole.SYSTEM, content="You are a helpful assistant."),
+        ChatMessage(role=MessageRole.USER, content="Hello!"),
+    ]
+    
+    openai_messages = openai_provider._message_dicts(messages)
+    
+    assert openai_messages[0] == {"role": "system", "content": "You are a helpful assistant."}
+    assert openai_messages[0]["role"] == "system"
+    assert openai_messages[1]["role"] == "user"
+    assert openai_messages[0]["content"] == "You are a helpful assistant."
+    assert openai_messages[1]["content"] == "Hello!"
+    
+    tool_reply = ChatMessage(role=MessageRole.TOOL, content="42", tool_call_id="call_1")
+    assert openai_provider._message_dicts([tool_reply]) == [
+        {"role": "tool", "content": "42", "tool_call_id": "call_1"}
+    ]
+
+
+def test_http_limits_configuration(deepseek_config):
+    """Test that configured connection pool limits reach httpx."""
+    from src.llm_factory.providers import DeepSeekProvider
+    
+    provider = DeepSeekProvider(deepseek_config)
+    limits = provider._setup_http_limits()
+    assert limits.max_connections == 100
+    assert limits.max_keepalive_connections == 20
+    
     config = ModelConfig(
-        provider=ProviderType.OPENAI,
-        model_name="gpt-4o",
+        provider=ProviderType.DEEPSEEK,
+        model_name="deepseek-chat",
         api_key="test-key",
+        http_limits={"max_connections": 2000, "max_keepalive_connections": 1500},
+    )
+    limits = DeepSeekProvider(config)._setup_http_limits()
+    assert limits.max_connections == 2000
+    assert limits.max_keepalive_connections == 1500
+
+
+async def test_claude_invokes_bedrock_off_the_event_loop():
+    """Test that blocking Bedrock calls run in a worker thread."""
+    import io
+    import json
+    import threading
+    
+    pytest.importorskip("boto3")
+    from src.llm_factory.providers import ClaudeProvider
+    
+    config = ModelConfig(
+        provider=ProviderType.CLAUDE,
+        model_name="anthropic.claude-3-5-sonnet-20241022-v2:0",
+        api_key="access-key",
+        api_base="secret-key",
     )
+    provider = ClaudeProvider(config)
+    threads = []
     
-    with patch('src.llm_factory.providers.openai_provider.AsyncAzureOpenAI'):
-        provider = OpenAIProvider(config)
-        cost = provider._calculate_cost(1000, 500, "gpt-4o")
-        expected_cost = (1000 / 1000) * 0.005 + (500 / 1000) * 0.015
-        assert cost == expected_cost
+    bodies = []
+    
+    def invoke_model(**kwargs):
+        threads.append(threading.current_thread())
+        bodies.append(json.loads(kwargs["body"]))
+        body = {"content": [{"text": "Hi!"}], "usage": {"input_tokens": 3, "output_tokens": 2}}
+        return {"body": io.BytesIO(json.dumps(body).encode())}
+    
+    provider.client = Mock(invoke_model=invoke_model)
+    response = await provider.chat_completion([ChatMessage(role="user", content="Hello")])
+    
+    assert response.choices[0]["message"]["content"] == "Hi!"
+    assert response.usage.total_tokens == 5
+    assert threads and threads[0] is not threading.current_thread()
+    assert bodies[0]["anthropic_version"] == "bedrock-2023-05-31"
+    assert bodies[0]["max_tokens"] == 4096
+    assert "thinking" not in bodies[0]
 
 
-@pytest.mark.asyncio
-async def test_message_conversion():
-    """Test message format conversion."""
-    messages = [
-        ChatMessage(role=MessageRole.SYSTEM, content="You are a helpful assistant."),
-        ChatMessage(role=MessageRole.USER, content="Hello!"),
+async def test_claude_stream_reads_events_in_background():
+    """Test that Bedrock stream events are parsed into chunks in order."""
+    import json
+    
+    pytest.importorskip("boto3")
+    from src.llm_factory.providers import ClaudeProvider
+    
+    config = ModelConfig(
+        provider=ProviderType.CLAUDE,
+        model_name="anthropic.claude-3-5-sonnet-20241022-v2:0",
+        api_key="access-key",
+        api_base="secret-key",
+    )
+    provider = ClaudeProvider(config)
+    payloads = [
+        {"type": "message_start"},
+        {"type": "content_block_delta", "delta": {"text": "Hel"}},
+        {"type": "content_block_delta", "delta": {"text": "lo"}},
+        {"type": "message_stop", "usage": {"input_tokens": 3, "output_tokens": 2}},
     ]
+    events = [{"chunk": {"bytes": json.dumps(p).encode()}} for p in payloads]
+    provider.client = Mock(invoke_model_with_response_stream=Mock(return_value={"body": events}))
+    
+    chunks = [
+        chunk async for chunk in provider.chat_completion_stream([ChatMessage(role="user", content="Hi")])
+    ]
+    
+    assert [c.choices[0]["delta"].get("content") for c in chunks] == ["Hel", "lo", None]
+    assert chunks[-1].choices[0]["finish_reason"] == "stop"
+    assert chunks[-1].usage.total_tokens == 5
+    assert all(c.usage is None for c in chunks[:-1])
+    assert len({c.id for c in chunks}) == 1
+    
+    # Bedrock reports stream token counts in its invocation metrics
+    metrics = {"inputTokenCount": 4, "outputTokenCount": 6}
+    stop = provider._event_to_chunk({"chunk": {"bytes": json.dumps(
+        {"type": "message_stop", "amazon-bedrock-invocationMetrics": metrics}
+    ).encode()}}, "chatcmpl-1", 0)
+    assert stop.usage.prompt_tokens == 4
+    assert stop.usage.total_tokens == 10
+
+
+def test_claude_providers_share_bedrock_client():
+    """Test that Claude providers with the same credentials reuse one client."""
+    pytest.importorskip("boto3")
+    from src.llm_factory.providers import ClaudeProvider
+    
+    def make(model_name, api_key="access-key"):
+        return ClaudeProvider(ModelConfig(
+            provider=ProviderType.CLAUDE,
+            model_name=model_name,
+            api_key=api_key,
+            api_base="secret-key",
+            region="us-east-1",
+        ))
+    
+    sonnet = make("anthropic.claude-3-5-sonnet-20241022-v2:0")
+    haiku = make("anthropic.claude-3-5-haiku-20241022-v1:0")
+    other = make("anthropic.claude-3-5-haiku-20241022-v1:0", api_key="other-key")
+    
+    assert sonnet.client is haiku.client
+    assert other.client is not sonnet.client
+    assert sonnet.client.meta.config.max_pool_connections == 64
+    
+    # Like the other providers, instances can be patched and weakly referenced
+    import weakref
+    with patch.object(sonnet, "chat_completion", Mock()):
+        pass
+    assert weakref.ref(sonnet)() is sonnet
+
+
+async def test_deepseek_reuses_pooled_client(deepseek_config):
+    """Test that DeepSeek requests go through the provider's long-lived client."""
+    import httpx
+    from src.llm_factory.providers import DeepSeekProvider
+    
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "Hi!"}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+        })
+    
+    provider = DeepSeekProvider(deepseek_config)
+    assert isinstance(provider.client, httpx.AsyncClient)
+    await provider.client.aclose()
+    provider.client = httpx.AsyncClient(transport=httpx.MockTransport(handler), headers=provider.headers)
+    
+    for _ in range(2):
+        response = await provider.chat_completion([ChatMessage(role="user", content="Hello")])
+        assert response.choices[0]["message"]["content"] == "Hi!"
+    
+    assert [str(r.url) for r in requests] == ["https://api.deepseek.com/v1/chat/completions"] * 2
+    assert requests[0].headers["authorization"] == "Bearer test-key"
+    
+    await provider.aclose()
+    assert provider.client.is_closed
+
+
+async def test_qwen_reuses_pooled_client(qwen_config):
+    """Test that Qwen requests go through the provider's long-lived client."""
+    import httpx
+    from src.llm_factory.providers import QwenProvider
+    
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={
+            "output": {"text": "Hi!", "finish_reason": "stop"},
+            "usage": {"input_tokens": 3, "output_tokens": 2, "total_tokens": 5},
+        })
+    
+    provider = QwenProvider(qwen_config)
+    assert isinstance(provider.client, httpx.AsyncClient)
+    await provider.client.aclose()
+    provider.client = httpx.AsyncClient(transport=httpx.MockTransport(handler), headers=provider.headers)
+    
+    for _ in range(2):
+        response = await provider.chat_completion([ChatMessage(role="user", content="Hello")])
+        assert response.choices[0]["message"]["content"] == "Hi!"
+    
+    url = "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation/generation"
+    assert [str(r.url) for r in requests] == [url] * 2
+    assert requests[0].headers["authorization"] == "Bearer test-key"
+    
+    await provider.aclose()
+    assert provider.client.is_closed
+
+
+async def test_response_cache_serves_repeated_deterministic_requests():
+    """Test that temperature-0 responses are cached and sampled ones are not."""
+    import json
+    import httpx
+    from src.llm_factory.providers import DeepSeekProvider
+    
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "Hi!"}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+        })
     
     config = ModelConfig(
-        provider=ProviderType.OPENAI,
-        model_name="gpt-4o",
+        provider=ProviderType.DEEPSEEK,
+        model_name="deepseek-chat",
         api_key="test-key",
+        response_cache_size=8,
     )
+    provider = DeepSeekProvider(config)
+    await provider.client.aclose()
+    provider.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    messages = [ChatMessage(role="user", content="Hello")]
     
-    with patch('src.llm_factory.providers.openai_provider.AsyncAzureOpenAI'):
-        provider = OpenAIProvider(config)
+    first = await provider.chat_completion(messages, temperature=0)
+    second = await provider.chat_completion(messages, temperature=0)
+    
+    assert len(requests) == 1
+    assert second.choices == first.choices
+    assert second.usage.cost == 0.0 and first.usage.cost > 0
+    assert provider.saved_tokens == 5
+    
+    await provider.chat_completion(messages, temperature=0.7)
+    await provider.chat_completion(messages, temperature=0.7)
+    assert len(requests) == 3
+    
+    await provider.aclose()
+    
+    # The cache follows the temperature actually sent: a config temperature of
+    # 0 is sent as 0 and cached, an unset one falls back to the sampled default
+    for temperature, expected_requests in ((0, 1), (None, 2)):
+        requests.clear()
+        config = ModelConfig(
+            provider=ProviderType.DEEPSEEK,
+            model_name="deepseek-chat",
+            api_key="test-key",
+            temperature=temperature,
+            response_cache_size=8,
+        )
+        provider = DeepSeekProvider(config)
+        await provider.client.aclose()
+        provider.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
         
-        openai_messages = [
-            {"role": msg.role.value, "content": msg.content}
-            for msg in messages
-        ]
+        await provider.chat_completion(messages)
+        await provider.chat_completion(messages)
+        assert len(requests) == expected_requests
+        sent = json.loads(requests[0].content)["temperature"]
+        assert sent == (1.0 if temperature is None else temperature)
         
-        assert openai_messages[0]["role"] == "system"
-        assert openai_messages[1]["role"] == "user"
-        assert openai_messages[0]["content"] == "You are a helpful assistant."
-        assert openai_messages[1]["content"] == "Hello!"
+        await provider.aclose()
+
+
+async def test_deepseek_stream_parses_sse_lines(deepseek_config):
+    """Test that DeepSeek SSE lines are decoded into chunks until [DONE]."""
+    import json
+    import httpx
+    from src.llm_factory.providers import DeepSeekProvider
+    
+    bodies = []
+    
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        events = [
+            {"id": "1", "choices": [{"index": 0, "delta": {"content": "Hel"}}]},
+            {"id": "2", "choices": [{"index": 0, "delta": {"content": "lo"}}],
+             "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}},
+        ]
+        text = "".join(f"data: {json.dumps(e)}\n\n" for e in events) + "data: [DONE]\n\n"
+        return httpx.Response(200, content=text.encode())
+    
+    provider = DeepSeekProvider(deepseek_config)
+    await provider.client.aclose()
+    provider.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    
+    chunks = [c async for c in provider.chat_completion_stream([ChatMessage(role="user", content="Hi")])]
+    
+    assert bodies[0]["stream"] is True
+    assert [c.choices[0]["delta"]["content"] for c in chunks] == ["Hel", "lo"]
+    assert chunks[-1].usage.total_tokens == 5
+    
+    chunks = [
+        c async for c in provider.chat_completion_stream(
+            [ChatMessage(role="user", content="Hi")], return_usage=False
+        )
+    ]
+    assert len(chunks) == 2 and chunks[-1].usage is None
+
+    await provider.aclose()
+
+
+async def test_qwen_stream_parses_sse_bytes(qwen_config):
+    """Test that Qwen SSE events are parsed from raw bytes into chunks."""
+    import json
+    import httpx
+    from src.llm_factory.providers import QwenProvider
+
+    bodies = []
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        events = [
+            {"output": {"text": "Hel"}},
+            {"output": {"text": "lo", "finish_reason": "stop"},
+             "usage": {"input_tokens": 3, "output_tokens": 2, "total_tokens": 5}},
+        ]
+        # DashScope omits the space after "data:"
+        text = "".join(f"id:{i}\ndata:{json.dumps(e)}\n\n" for i, e in enumerate(events))
+        return httpx.Response(200, content=text.encode())
+
+    provider = QwenProvider(qwen_config)
+    await provider.client.aclose()
+    provider.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    chunks = [
+        c async for c in provider.chat_completion_stream([ChatMessage(role="user", content="Hi")], temperature=0.2)
+    ]
+
+    assert bodies[0]["parameters"] == {
+        "temperature": 0.2, "max_tokens": 2000, "top_p": 0.8, "incremental_output": True
+    }
+    assert [c.choices[0]["delta"]["content"] for c in chunks] == ["Hel", "lo"]
+    assert chunks[-1].choices[0]["finish_reason"] == "stop"
+    assert chunks[-1].usage.total_tokens == 5
+
+    await provider.aclose()
+
+
+async def test_iter_sse_data_handles_split_lines():
+    """Test that SSE payloads split across network chunks are reassembled."""
+    from src.llm_factory.providers.base import iter_sse_data
+    
+    class FakeResponse:
+        async def aiter_bytes(self):
+            for chunk in [b'data: {"a"', b': 1}\r\n\r\n: keep-alive\ndata:\ndata: \r\n', b'data:{"b": 2}\n\nda', b"ta: [DONE]"]:
+                yield chunk
+    
+    payloads = [data async for data in iter_sse_data(FakeResponse())]
+    
+    assert payloads == [b'{"a": 1}', b'{"b": 2}', b"[DONE]"]
+
+
+async def test_max_concurrency_limits_requests_in_flight():
+    """Test that max_concurrency caps parallel requests to one provider."""
+    import asyncio
+    import httpx
+    from src.llm_factory.providers import DeepSeekProvider
+    
+    active = []
+    peak = []
+    
+    async def handler(request):
+        active.append(request)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+        return httpx.Response(200, json={"choices": [], "usage": {}})
+    
+    config = ModelConfig(
+        provider=ProviderType.DEEPSEEK,
+        model_name="deepseek-chat",
+        api_key="test-key",
+        max_concurrency=2,
+    )
+    provider = DeepSeekProvider(config)
+    await provider.client.aclose()
+    provider.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    
+    messages = [ChatMessage(role="user", content="Hello")]
+    await asyncio.gather(*(provider.chat_completion(messages) for _ in range(6)))
+    
+    assert len(peak) == 6
+    assert max(peak) == 2
+    
+    await provider.aclose()
+
+
+async def test_chat_completion_batch_keeps_order_and_errors(qwen_config):
+    """Test that batched requests run concurrently and return in input order."""
+    import asyncio
+    import json
+    import httpx
+    from src.llm_factory.providers import QwenProvider
+    
+    in_flight = 0
+    peak = []
+    
+    async def handler(request):
+        nonlocal in_flight
+        in_flight += 1
+        peak.append(in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        text = json.loads(request.content)["input"]["messages"][0]["content"]
+        if text == "fail":
+            return httpx.Response(500)
+        return httpx.Response(200, json={
+            "output": {"text": text.upper(), "finish_reason": "stop"},
+            "usage": {"input_tokens": 1, "output_tokens": 1, "total_tokens": 2},
+        })
+    
+    provider = QwenProvider(qwen_config)
+    await provider.client.aclose()
+    provider.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    
+    batch = [[ChatMessage(role="user", content=text)] for text in ["a", "fail", "c", "d"]]
+    results = await provider.chat_completion_batch(batch, concurrency=2)
+    
+    assert results[0].choices[0]["message"]["content"] == "A"
+    assert isinstance(results[1], httpx.HTTPStatusError)
+    assert [r.choices[0]["message"]["content"] for r in results[2:]] == ["C", "D"]
+    assert max(peak) == 2
+    
+    await provider.aclose()
+
+
+async def test_token_bucket_waits_for_refill():
+    """Test that the tokens-per-minute bucket delays requests over budget."""
+    import time
+    from src.llm_factory.providers.base import TokenBucket
+    
+    bucket = TokenBucket(6000)  # refills 100 tokens per second
+    start = time.monotonic()
+    await bucket.acquire(6000)
+    assert time.monotonic() - start < 0.05
+    
+    await bucket.acquire(5)
+    assert time.monotonic() - start >= 0.04
+
+
+def test_proxy_is_resolved_once_for_the_client(qwen_config):
+    """Test that the configured proxy URL is resolved when the client is built."""
+    import warnings
+    from src.llm_factory.utils import ProxyContext
+    from src.llm_factory.providers import QwenProvider
+    
+    assert QwenProvider(qwen_config)._proxy_url() is None
+    
+    config = qwen_config.model_copy(update={"proxy_config": {"https": "http://proxy:8080"}})
+    assert QwenProvider(config)._proxy_url() == "http://proxy:8080"
+    
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        with ProxyContext(None):
+            pass
+    assert caught[0].category is DeprecationWarning
+
+
+def test_usage_is_priced_from_one_read_of_token_counts(qwen_config):
+    """Test that usage totals default to the sum and are priced once."""
+    from src.llm_factory.providers import QwenProvider
+    
+    provider = QwenProvider(qwen_config)
+    
+    usage = provider._create_usage(1000, 500)
+    assert usage.total_tokens == 1500
+    assert usage.cost == provider._calculate_cost(1000, 500, "qwen-turbo")
+    assert provider._create_usage(1000, 500, 1600).total_tokens == 1600
+
+
+def test_http2_falls_back_without_h2(deepseek_config):
+    """Test that http2 is only enabled when the h2 package is importable."""
+    import importlib.util
+    from src.llm_factory.providers import DeepSeekProvider
+    
+    provider = DeepSeekProvider(deepseek_config)
+    assert provider._use_http2() is False
+    
+    config = deepseek_config.model_copy(update={"http2": True})
+    provider = DeepSeekProvider(config)
+    assert provider._use_http2() is (importlib.util.find_spec("h2") is not None)
+
+
+def test_openai_stream_choice_reads_delta_fields():
+    """Test that streamed OpenAI choices are converted without model_dump()."""
+    from openai.types.chat.chat_completion_chunk import Choice, ChoiceDelta
+    from src.llm_factory.providers import OpenAIProvider
+    
+    choice = Choice(index=0, delta=ChoiceDelta(role="assistant", content="Hi"), finish_reason=None)
+    assert OpenAIProvider._stream_choice(choice) == {
+        "index": 0,
+        "delta": {"role": "assistant", "content": "Hi"},
+        "finish_reason": None,
+    }
+    
+    # Less common fields are passed through rather than dropped
+    from openai.types.chat.chat_completion_chunk import ChoiceLogprobs
+    choice = Choice(
+        index=0,
+        delta=ChoiceDelta(role="assistant", refusal="No"),
+        finish_reason=None,
+        logprobs=ChoiceLogprobs(content=[]),
+    )
+    converted = OpenAIProvider._stream_choice(choice)
+    assert converted["logprobs"] == {"content": [], "refusal": None}
+    assert converted["delta"]["refusal"] == "No"
+
+
+def test_cost_is_summed_in_integer_nano_dollars(deepseek_config):
+    """Test that costs are computed exactly in integer nano-dollars."""
+    from src.llm_factory.providers import DeepSeekProvider
+    
+    provider = DeepSeekProvider(deepseek_config)
+    
+    # deepseek-chat: $0.00014 / $0.00028 per 1K tokens -> 140 / 280 nano-dollars per token
+    assert provider._calculate_cost_nano(1000, 500, "deepseek-chat") == 280_000
+    assert provider._calculate_cost(1000, 500, "deepseek-chat") == 0.00028
+    assert provider._calculate_cost_nano(1000, 500, "unknown-model") is None
+
+
+async def test_in_memory_cache_expires_evicts_and_invalidates():
+    """Test the in-process response cache backend."""
+    from src.llm_factory.providers.cache import InMemoryLRU
+    
+    cache = InMemoryLRU(maxsize=2)
+    await cache.set("gpt-4o:a", b"a", ttl=60)
+    await cache.set("gpt-4o:b", b"b", ttl=60)
+    await cache.get("gpt-4o:a")
+    await cache.set("qwen-max:c", b"c", ttl=60)  # evicts the least recently used key
+    
+    assert await cache.get("gpt-4o:a") == b"a"
+    assert await cache.get("gpt-4o:b") is None
+    
+    await cache.invalidate("gpt-4o:")
+    assert await cache.get("gpt-4o:a") is None
+    assert await cache.get("qwen-max:c") == b"c"
+    
+    await cache.set("expired", b"x", ttl=0)
+    assert await cache.get("expired") is None
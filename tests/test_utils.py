@@ -0,0 +1,113 @@
+"""
+Tests for utility helpers.
+"""
+
+from src.llm_factory.utils import MetricsCollector
+
+
+def test_metrics_summary_and_breakdown():
+    """Test that summaries come from running totals per provider."""
+    collector = MetricsCollector()
+    collector.record_request("openai", "gpt-4o", 10, 5, cost=0.5, latency=1.0)
+    collector.record_request("openai", "gpt-4o", 20, 5, cost=0.25, latency=3.0, success=False, error="boom")
+    collector.record_request("qwen", "qwen-max", 4, 4)
+    
+    summary = collector.get_summary()
+    assert summary["total_requests"] == 3
+    assert summary["successful_requests"] == 2
+    assert summary["total_tokens"] == 48
+    assert summary["total_cost"] == 0.75
+    assert summary["average_latency"] == 2.0
+    
+    breakdown = collector.get_provider_breakdown()
+    assert breakdown["openai"] == collector.get_summary("openai")
+    assert breakdown["openai"]["success_rate"] == 0.5
+    assert breakdown["qwen"]["average_latency"] == 0
+    assert collector.get_summary("deepseek") == {"total_requests": 0}
+    assert len(collector.metrics) == 3
+    
+    # Records round-trip through the typed record columns
+    first, second, third = collector.metrics
+    assert first["provider"] == "openai" and first["model"] == "gpt-4o"
+    assert first["total_tokens"] == 15 and first["error"] is None
+    assert second["success"] is False and second["error"] == "boom"
+    assert third["model"] == "qwen-max"
+    assert third["cost"] is None and third["latency"] is None
+    
+    collector.clear_metrics()
+    assert collector.get_summary() == {"total_requests": 0}
+    assert collector.get_provider_breakdown() == {}
+
+
+def test_metrics_without_raw_records():
+    """Test that summaries still work when per-request records are off."""
+    collector = MetricsCollector(collect_raw=False)
+    collector.record_request("openai", "gpt-4o", 10, 5, cost=0.5)
+    
+    assert collector.metrics == []
+    assert collector.get_summary("openai")["total_tokens"] == 15
+
+
+def test_metrics_logs_running_totals_periodically():
+    """Test that totals are logged every log_every requests, not per request."""
+    from loguru import logger
+    
+    messages = []
+    sink = logger.add(messages.append, level="INFO", format="{message}")
+    try:
+        collector = MetricsCollector(log_every=2)
+        for _ in range(5):
+            collector.record_request("openai", "gpt-4o", 1, 1, cost=0.5)
+    finally:
+        logger.remove(sink)
+    
+    assert [m.strip() for m in messages] == [
+        "Metrics: 2 requests, 2 successful, 4 tokens, $1.0000",
+        "Metrics: 4 requests, 4 successful, 8 tokens, $2.0000",
+    ]
+
+
+def test_load_config_from_file_reuses_parse_until_modified(tmp_path):
+    """Test that the YAML file is only re-parsed after it changes."""
+    import os
+    from src.llm_factory.utils import config as config_module
+    from src.llm_factory.utils import load_config_from_file
+    
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("providers:\n  - provider: qwen\n    model_name: qwen-max\n    api_key: k\n")
+    config_module._parse_yaml_file.cache_clear()
+    
+    first = load_config_from_file(str(config_file))
+    second = load_config_from_file(str(config_file))
+    assert [c.model_name for c in second] == ["qwen-max"]
+    assert first[0] is not second[0]
+    assert config_module._parse_yaml_file.cache_info().misses == 1
+    
+    config_file.write_text("providers:\n  - provider: qwen\n    model_name: qwen-plus\n    api_key: k\n")
+    stat = config_file.stat()
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert [c.model_name for c in load_config_from_file(str(config_file))] == ["qwen-plus"]
+    
+    assert load_config_from_file(str(tmp_path / "missing.yaml")) == []
+
+
+def test_load_config_from_env_rebuilds_only_on_change(monkeypatch):
+    """Test that env configs are cached until a variable they read changes."""
+    from src.llm_factory.utils import config as config_module
+    from src.llm_factory.utils import load_config_from_env
+    
+    for var in config_module._ENV_VARS:
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv("QWEN_API_KEY", "k")
+    monkeypatch.setenv("HTTPS_PROXY", "http://proxy:8080")
+    config_module._configs_from_env_values.cache_clear()
+    
+    first = load_config_from_env()
+    second = load_config_from_env()
+    assert [c.model_name for c in second] == ["qwen-turbo"]
+    assert second[0].proxy_config == {"https": "http://proxy:8080"}
+    assert first[0] is not second[0]
+    assert config_module._configs_from_env_values.cache_info().misses == 1
+    
+    monkeypatch.setenv("QWEN_MODEL", "qwen-max")
+    assert [c.model_name for c in load_config_from_env()] == ["qwen-max"]